@@ -0,0 +1,366 @@
+"""One-time database initialization and the fast boot-time schema check.
+
+Schema creation and seeding run at most once per database, guarded by a
+Postgres advisory lock so concurrently booting workers never race into
+``seed_database``. Every other boot only reads the recorded schema version.
+
+Run the init step explicitly (e.g. as a deploy hook) with::
+
+    python -m backend.db.bootstrap
+
+Set ``ASSOCIATION_PARTITIONS=N`` to hash-partition
+``company_collection_associations`` by ``collection_id`` into N partitions.
+New databases are created partitioned; an existing unpartitioned table is
+only converted in place (a full rewrite under an ACCESS EXCLUSIVE lock) by
+re-running the init step with ``--force``, never during a normal boot.
+"""
+import os
+import sys
+
+import randomname
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from backend.db import database
+
+# Bump whenever the init step needs to run again (new tables, columns, triggers).
+SCHEMA_VERSION = 8
+
+# Arbitrary application-wide key for pg_advisory_lock.
+INIT_ADVISORY_LOCK_KEY = 7_202_601
+
+# 0 keeps company_collection_associations a single heap table
+ASSOCIATION_PARTITIONS = int(os.getenv("ASSOCIATION_PARTITIONS", "0"))
+
+SCHEMA_VERSION_SETTING = "schema_version"
+SEEDED_SETTING = "seeded"
+
+# Idempotent DDL applied after create_all, for changes create_all can't make
+# to existing tables.
+MIGRATIONS = [
+    "ALTER TABLE harmonic_settings ADD COLUMN IF NOT EXISTS setting_value VARCHAR",
+    "ALTER TABLE transfer_jobs ADD COLUMN IF NOT EXISTS kind VARCHAR DEFAULT 'transfer'",
+    "ALTER TABLE transfer_jobs ADD COLUMN IF NOT EXISTS undo_of_job_id VARCHAR "
+    "REFERENCES transfer_jobs (id)",
+    "ALTER TABLE transfer_jobs ADD COLUMN IF NOT EXISTS conflicts INTEGER DEFAULT 0",
+    "ALTER TABLE transfer_jobs ADD COLUMN IF NOT EXISTS selection VARCHAR",
+    "ALTER TABLE transfer_journal_entries ADD COLUMN IF NOT EXISTS txid BIGINT "
+    "NOT NULL DEFAULT txid_current()",
+    "DROP INDEX IF EXISTS ix_transfer_journal_collection_seq",
+    "CREATE INDEX IF NOT EXISTS ix_transfer_journal_collection_txid "
+    "ON transfer_journal_entries (collection_id, txid)",
+    "ALTER TABLE transfer_jobs ADD COLUMN IF NOT EXISTS worker_lease INTEGER",
+]
+
+
+class SchemaNotReadyError(RuntimeError):
+    """Raised when the database schema is missing or older than this build."""
+
+
+class PartitionConversionError(RuntimeError):
+    """Raised when existing associations can't be moved into partitions as-is."""
+
+
+def get_schema_version(engine: Engine) -> int:
+    """Read the recorded schema version, or 0 if the database is uninitialized."""
+    with engine.connect() as conn:
+        table = conn.execute(
+            text("SELECT to_regclass('harmonic_settings')")
+        ).scalar()
+        if table is None:
+            return 0
+
+        has_value_column = conn.execute(
+            text("""
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'harmonic_settings'
+                  AND column_name = 'setting_value'
+            """)
+        ).scalar()
+        if not has_value_column:
+            return 0
+
+        version = conn.execute(
+            text(
+                "SELECT setting_value FROM harmonic_settings "
+                "WHERE setting_name = :name"
+            ),
+            {"name": SCHEMA_VERSION_SETTING},
+        ).scalar()
+    return int(version) if version else 0
+
+
+def check_schema(engine: Engine) -> None:
+    """Fast boot path: verify the schema version without touching any data."""
+    version = get_schema_version(engine)
+    if version != SCHEMA_VERSION:
+        raise SchemaNotReadyError(
+            f"Database schema version is {version}, expected {SCHEMA_VERSION}; "
+            "run `python -m backend.db.bootstrap`"
+        )
+
+
+def ensure_schema(engine: Engine) -> None:
+    """Fast boot path, falling back to the locked init step when needed."""
+    if get_schema_version(engine) == SCHEMA_VERSION:
+        return
+    initialize_database(engine)
+
+
+def initialize_database(engine: Engine, force: bool = False) -> None:
+    """Create/migrate the schema and seed once, holding the init advisory lock.
+
+    Workers that lose the race block on the lock and then find the schema
+    already at the current version. ``force`` re-runs the idempotent steps
+    even when the version is current, and is required to convert an
+    existing unpartitioned associations table.
+    """
+    with engine.connect() as lock_conn:
+        lock_conn.execute(
+            text("SELECT pg_advisory_lock(:key)"), {"key": INIT_ADVISORY_LOCK_KEY}
+        )
+        lock_conn.commit()
+        try:
+            if get_schema_version(engine) == SCHEMA_VERSION and not force:
+                return
+
+            create_tables(engine, convert_existing=force)
+            with engine.begin() as conn:
+                for statement in MIGRATIONS:
+                    conn.execute(text(statement))
+
+            db = database.SessionLocal(bind=engine)
+            try:
+                if not db.query(database.Settings).get(SEEDED_SETTING):
+                    seed_database(db)
+                    db.add(database.Settings(setting_name=SEEDED_SETTING))
+                    db.commit()
+
+                db.merge(
+                    database.Settings(
+                        setting_name=SCHEMA_VERSION_SETTING,
+                        setting_value=str(SCHEMA_VERSION),
+                    )
+                )
+                db.commit()
+            finally:
+                db.close()
+        finally:
+            lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"),
+                {"key": INIT_ADVISORY_LOCK_KEY},
+            )
+            lock_conn.commit()
+
+
+def create_tables(
+    engine: Engine,
+    partitions: int = ASSOCIATION_PARTITIONS,
+    convert_existing: bool = False,
+) -> None:
+    """create_all, except that associations may be a partitioned table."""
+    if not partitions:
+        database.Base.metadata.create_all(bind=engine)
+        return
+
+    associations = database.CompanyCollectionAssociation.__table__
+    database.Base.metadata.create_all(
+        bind=engine,
+        tables=[t for t in database.Base.metadata.sorted_tables if t is not associations],
+    )
+    with engine.begin() as conn:
+        ensure_partitioned_associations(conn, partitions, convert_existing)
+
+
+def ensure_partitioned_associations(
+    conn: Connection, partitions: int, convert_existing: bool = False
+) -> None:
+    """Create company_collection_associations hash-partitioned by collection_id.
+
+    The ORM model is unchanged: ``id`` stays unique via its sequence, while
+    the table's primary key becomes ``(id, collection_id)`` because a
+    partitioned table's keys must include the partition key. The
+    ``uq_company_collection`` constraint already does. Queries filtering on
+    ``collection_id`` (pages, counts, transfer deletes, emptying a
+    collection) are pruned to a single partition.
+
+    An existing unpartitioned table is left alone unless
+    ``convert_existing``; then it is converted in place and its rows are
+    copied before the throttle trigger is re-created. The partition key
+    makes ``collection_id`` NOT NULL, so rows without one abort the
+    conversion with ``PartitionConversionError`` before anything changes.
+    """
+    relkind = conn.execute(text("""
+        SELECT relkind FROM pg_class
+        WHERE oid = to_regclass('company_collection_associations')
+    """)).scalar()
+    if relkind == "p":
+        return
+    if relkind is not None and not convert_existing:
+        print(
+            "company_collection_associations is not partitioned; run "
+            "`python -m backend.db.bootstrap --force` to convert it"
+        )
+        return
+
+    had_throttle_trigger = False
+    if relkind is not None:
+        unassigned = conn.execute(text("""
+            SELECT count(*) FROM company_collection_associations
+            WHERE collection_id IS NULL
+        """)).scalar()
+        if unassigned:
+            raise PartitionConversionError(
+                f"{unassigned} company_collection_associations rows have no "
+                "collection_id; delete or assign them before partitioning"
+            )
+
+        had_throttle_trigger = bool(conn.execute(text("""
+            SELECT 1 FROM pg_trigger
+            WHERE tgrelid = 'company_collection_associations'::regclass
+              AND tgname = 'throttle_updates_trigger'
+        """)).scalar())
+        conn.execute(text("""
+            LOCK TABLE company_collection_associations IN ACCESS EXCLUSIVE MODE;
+            ALTER TABLE company_collection_associations
+                RENAME TO company_collection_associations_unpartitioned;
+            ALTER TABLE company_collection_associations_unpartitioned
+                RENAME CONSTRAINT uq_company_collection TO uq_company_collection_unpartitioned;
+            ALTER TABLE company_collection_associations_unpartitioned
+                RENAME CONSTRAINT company_collection_associations_pkey
+                TO company_collection_associations_unpartitioned_pkey;
+            ALTER INDEX IF EXISTS ix_company_collection_associations_id
+                RENAME TO ix_company_collection_associations_unpartitioned_id;
+        """))
+
+    conn.execute(text("""
+        CREATE SEQUENCE IF NOT EXISTS company_collection_associations_id_seq;
+        CREATE TABLE company_collection_associations (
+            created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+            id INTEGER DEFAULT nextval('company_collection_associations_id_seq') NOT NULL,
+            company_id INTEGER REFERENCES companies (id),
+            collection_id UUID REFERENCES company_collections (id),
+            PRIMARY KEY (id, collection_id),
+            CONSTRAINT uq_company_collection UNIQUE (company_id, collection_id)
+        ) PARTITION BY HASH (collection_id);
+        CREATE INDEX ix_company_collection_associations_id
+            ON company_collection_associations (id);
+    """))
+    for remainder in range(partitions):
+        conn.execute(text(f"""
+            CREATE TABLE company_collection_associations_p{remainder}
+            PARTITION OF company_collection_associations
+            FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})
+        """))
+
+    if relkind is not None:
+        conn.execute(text("""
+            INSERT INTO company_collection_associations
+                (created_at, id, company_id, collection_id)
+            SELECT created_at, id, company_id, collection_id
+            FROM company_collection_associations_unpartitioned;
+            ALTER SEQUENCE company_collection_associations_id_seq
+                OWNED BY company_collection_associations.id;
+            DROP TABLE company_collection_associations_unpartitioned;
+        """))
+    else:
+        conn.execute(text("""
+            ALTER SEQUENCE company_collection_associations_id_seq
+                OWNED BY company_collection_associations.id
+        """))
+
+    if had_throttle_trigger:
+        conn.execute(text("""
+            CREATE TRIGGER throttle_updates_trigger
+            BEFORE INSERT ON company_collection_associations
+            FOR EACH ROW
+            EXECUTE FUNCTION throttle_updates();
+        """))
+
+
+def seed_database(db: Session):
+    db.execute(text("TRUNCATE TABLE company_collections CASCADE;"))
+    db.execute(text("TRUNCATE TABLE companies CASCADE;"))
+    db.execute(text("TRUNCATE TABLE company_collection_associations CASCADE;"))
+    db.execute(
+        text("""
+    DROP TRIGGER IF EXISTS throttle_updates_trigger ON company_collection_associations;
+    """)
+    )
+    db.commit()
+
+    companies = [
+        database.Company(company_name=randomname.get_name().replace("-", " ").title())
+        for _ in range(10000)
+    ]
+    db.bulk_save_objects(companies)
+    db.commit()
+
+    my_list = database.CompanyCollection(collection_name="My List")
+    db.add(my_list)
+    db.commit()
+
+    associations = [
+        database.CompanyCollectionAssociation(
+            company_id=company.id, collection_id=my_list.id
+        )
+        for company in db.query(database.Company).limit(50000).all()
+    ]
+    db.bulk_save_objects(associations)
+    db.commit()
+
+    liked_companies = database.CompanyCollection(collection_name="Liked Companies List")
+    db.add(liked_companies)
+    db.commit()
+
+    associations = [
+        database.CompanyCollectionAssociation(
+            company_id=company.id, collection_id=liked_companies.id
+        )
+        for company in db.query(database.Company).limit(10).all()
+    ]
+    db.bulk_save_objects(associations)
+    db.commit()
+
+    companies_to_ignore = database.CompanyCollection(
+        collection_name="Companies to Ignore List"
+    )
+    db.add(companies_to_ignore)
+    db.commit()
+
+    associations = [
+        database.CompanyCollectionAssociation(
+            company_id=company.id, collection_id=companies_to_ignore.id
+        )
+        for company in db.query(database.Company).limit(50).all()
+    ]
+    db.bulk_save_objects(associations)
+    db.commit()
+
+    db.execute(
+        text("""
+CREATE OR REPLACE FUNCTION throttle_updates()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_sleep(0.1); -- Sleep for 100 milliseconds to simulate a slow update
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+    """)
+    )
+
+    db.execute(
+        text("""
+CREATE TRIGGER throttle_updates_trigger
+BEFORE INSERT ON company_collection_associations
+FOR EACH ROW
+EXECUTE FUNCTION throttle_updates();
+    """)
+    )
+    db.commit()
+
+
+if __name__ == "__main__":
+    initialize_database(database.engine, force="--force" in sys.argv[1:])
+    print(f"Database initialized at schema version {SCHEMA_VERSION}")
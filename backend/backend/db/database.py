@@ -1,30 +1,57 @@
 # app/database.py
 import os
+import time
 import uuid
 from datetime import datetime
 from typing import Union
 
+from fastapi import Request, Response
 from sqlalchemy import (
+    BigInteger,
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
     create_engine,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 SQLALCHEMY_DATABASE_URL = os.getenv('DATABASE_URL')
+# Optional read replica for read-only routes; may point at the primary too.
+SQLALCHEMY_READ_DATABASE_URL = os.getenv('DATABASE_READ_URL')
+
+# After a client's own write, its reads go to the primary for this long so
+# replica lag never hides the change from them.
+READ_YOUR_WRITES_WINDOW_SECONDS = float(os.getenv('READ_YOUR_WRITES_WINDOW_SECONDS', '5'))
+READ_YOUR_WRITES_COOKIE = "harmonic_last_write"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+read_engine = (
+    create_engine(SQLALCHEMY_READ_DATABASE_URL)
+    if SQLALCHEMY_READ_DATABASE_URL
+    and SQLALCHEMY_READ_DATABASE_URL != SQLALCHEMY_DATABASE_URL
+    else engine
+)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+def ping_engines() -> None:
+    """Run a trivial query on the primary and, if separate, the read replica."""
+    for pinged in dict.fromkeys((engine, read_engine)):
+        with pinged.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
 def get_db():
     db = SessionLocal()
     try:
@@ -33,6 +60,37 @@ def get_db():
         db.close()
 
 
+def get_read_db(request: Request):
+    """Session for read-only routes: replica, unless the client wrote recently."""
+    if wrote_recently(request):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def wrote_recently(request: Request) -> bool:
+    primary_until = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    try:
+        return time.time() < float(primary_until)
+    except (TypeError, ValueError):
+        return False
+
+
+def mark_client_write(response: Response) -> None:
+    """Pin this client's reads to the primary for the read-your-writes window."""
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE,
+        str(time.time() + READ_YOUR_WRITES_WINDOW_SECONDS),
+        max_age=int(READ_YOUR_WRITES_WINDOW_SECONDS) + 1,
+        httponly=True,
+        samesite="lax",
+    )
+
+
 # SQLAlchemy models
 Base = declarative_base()
 
@@ -40,6 +98,7 @@ class Settings(Base):
     __tablename__ = "harmonic_settings"
 
     setting_name = Column(String, primary_key=True)
+    setting_value = Column(String, nullable=True)
 
 class Company(Base):
     __tablename__ = "companies"
@@ -83,10 +142,36 @@ class TransferJob(Base):
     source_collection_id = Column(UUID(as_uuid=True), ForeignKey("company_collections.id"))
     dest_collection_id = Column(UUID(as_uuid=True), ForeignKey("company_collections.id"))
     company_ids = Column(String)  # JSON string of company IDs
+    selection = Column(String, nullable=True)  # JSON CompanySelection
+    kind = Column(String, default="transfer")  # transfer, undo
+    undo_of_job_id = Column(String, ForeignKey("transfer_jobs.id"), nullable=True)
     status = Column(String, default="pending")  # pending, processing, completed, failed
     progress = Column(Integer, default=0)
     total = Column(Integer)
+    conflicts = Column(Integer, default=0)  # lock conflicts retried so far
+    worker_lease = Column(Integer, nullable=True)  # WorkerLease key of the queueing process
     error_message = Column(String, nullable=True)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
 
+
+# Journal actions: the association was inserted / deleted by the job
+JOURNAL_ADDED = "+"
+JOURNAL_REMOVED = "-"
+
+class TransferJournalEntry(Base):
+    """One association a job actually changed; used to undo it set-wise.
+
+    ``txid`` is the writing transaction's id, the change-feed sequence number.
+    """
+    __tablename__ = "transfer_journal_entries"
+    __table_args__ = (
+        Index('ix_transfer_journal_collection_txid', 'collection_id', 'txid'),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    job_id = Column(String, ForeignKey("transfer_jobs.id"), index=True, nullable=False)
+    collection_id = Column(UUID(as_uuid=True), nullable=False)
+    company_id = Column(Integer, nullable=False)
+    action = Column(String(1), nullable=False)
+    txid = Column(BigInteger, nullable=False, server_default=text("txid_current()"))
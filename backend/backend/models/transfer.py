@@ -5,11 +5,41 @@ from typing import List, Optional
 from pydantic import BaseModel
 
 
+class CompanySelection(BaseModel):
+    """Companies of the source collection, described instead of listed.
+
+    Selects ``include_ids``, plus every member whose name matches ``search``
+    when ``all_matching`` is set, minus ``exclude_ids``. The server resolves
+    it chunk by chunk, so "all results except these few" stays a tiny body.
+    """
+    search: str = ""
+    all_matching: bool = False
+    include_ids: List[int] = []
+    exclude_ids: List[int] = []
+
+
 class TransferRequest(BaseModel):
     """Request schema for company transfer operations."""
-    company_ids: List[int]
+    company_ids: List[int] = []
     dest_collection_id: uuid.UUID
     transfer_all: bool = False
+    selection: Optional[CompanySelection] = None
+
+    def resolved_selection(self) -> CompanySelection:
+        """The explicit selection, or the legacy ids / ``transfer_all`` form."""
+        if self.selection is not None:
+            return self.selection
+        if self.transfer_all:
+            return CompanySelection(all_matching=True)
+        return CompanySelection(include_ids=self.company_ids)
+
+
+class TransferPlanOutput(BaseModel):
+    """Pre-flight breakdown of a transfer request."""
+    requested: int
+    missing_from_source: int
+    already_in_destination: int
+    to_move: int
 
 
 class TransferResponse(BaseModel):
@@ -17,6 +47,7 @@ class TransferResponse(BaseModel):
     job_id: Optional[str] = None
     status: str
     message: str
+    plan: Optional[TransferPlanOutput] = None
 
 
 class JobStatusResponse(BaseModel):
@@ -26,4 +57,8 @@ class JobStatusResponse(BaseModel):
     progress: int
     total: int
     eta_seconds: Optional[int] = None
-    error_message: Optional[str] = None
\ No newline at end of file
+    error_message: Optional[str] = None
+    conflicts: int = 0
+    queue_position: Optional[int] = None
+    queue_depth: Optional[int] = None
+    wait_seconds: Optional[float] = None
\ No newline at end of file
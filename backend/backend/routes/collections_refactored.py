@@ -1,15 +1,28 @@
 """Collections API endpoints with proper separation of concerns."""
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
 from pydantic import BaseModel
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from backend.db import database
-from backend.models.transfer import TransferRequest, TransferResponse, JobStatusResponse
-from backend.routes.companies import CompanyBatchOutput, fetch_companies_with_liked
+from backend.models.transfer import (
+    JobStatusResponse,
+    TransferPlanOutput,
+    TransferRequest,
+    TransferResponse,
+)
+from backend.routes.companies import CompanyBatchOutput, fetch_company_page
+from backend.routes.responses import FastJSONResponse
+from backend.services.change_feed import ChangeFeedService
+from backend.services.count_service import CountService, CountStrategy
+from backend.services.transfer_scheduler import (
+    TransferQueueFullError,
+    priority_for,
+    transfer_scheduler,
+)
 from backend.services.transfer_service import TransferJobService
 
 
@@ -32,7 +45,25 @@ class CompanyCollectionMetadata(BaseModel):
 
 class CompanyCollectionOutput(CompanyBatchOutput, CompanyCollectionMetadata):
     """Full company collection with companies data."""
-    pass
+    # Pass as ``since`` to /changes to keep this page up to date
+    change_seq: int = 0
+
+
+class CollectionChangeOutput(BaseModel):
+    """One company's net membership change."""
+    seq: int
+    company_id: int
+    action: str  # added, removed
+
+
+class CollectionChangesOutput(BaseModel):
+    """Changes from ``since`` to ``seq`` (the next ``since``); reload pages
+    instead when ``snapshot_required``.
+    """
+    collection_id: uuid.UUID
+    seq: int
+    snapshot_required: bool
+    changes: List[CollectionChangeOutput]
 
 
 def validate_collections_exist(
@@ -52,15 +83,24 @@ def validate_collections_exist(
     return source_collection, dest_collection
 
 
-def get_company_ids_for_collection(
-    db: Session, 
-    collection_id: uuid.UUID
-) -> List[int]:
-    """Get all company IDs for a given collection."""
-    associations = db.query(database.CompanyCollectionAssociation).filter(
-        database.CompanyCollectionAssociation.collection_id == collection_id
-    ).all()
-    return [assoc.company_id for assoc in associations]
+def get_user_key(http_request: Request) -> str:
+    """Identify the caller for fair scheduling between users."""
+    user_id = http_request.headers.get("X-User-Id")
+    if user_id:
+        return user_id
+    return http_request.client.host if http_request.client else "anonymous"
+
+
+def check_transfer_admission() -> None:
+    """Reject new background work with 429 while the scheduler backlog is full."""
+    try:
+        transfer_scheduler.check_admission()
+    except TransferQueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after_seconds)},
+        )
 
 
 def calculate_eta_seconds(progress: int, total: int) -> Optional[int]:
@@ -74,7 +114,7 @@ def calculate_eta_seconds(progress: int, total: int) -> Optional[int]:
 
 @router.get("", response_model=List[CompanyCollectionMetadata])
 def get_all_collection_metadata(
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
 ) -> List[CompanyCollectionMetadata]:
     """Get metadata for all collections."""
     collections = db.query(database.CompanyCollection).all()
@@ -103,9 +143,15 @@ def get_company_collection_by_id(
     offset: int = Query(0, description="The number of items to skip from the beginning"),
     limit: int = Query(10, description="The number of items to fetch"),
     search: str = Query("", description="Search companies by name"),
-    db: Session = Depends(database.get_db),
-) -> CompanyCollectionOutput:
+    count_strategy: CountStrategy = Query(
+        CountStrategy.EXACT, description="How to compute the total count"
+    ),
+    db: Session = Depends(database.get_read_db),
+) -> FastJSONResponse:
     """Get a specific collection with its companies."""
+    # Read first: changes racing the page load are replayed, never skipped
+    change_seq = ChangeFeedService.head(db)
+    
     query = (
         db.query(database.CompanyCollectionAssociation, database.Company)
         .join(database.Company)
@@ -118,17 +164,56 @@ def get_company_collection_by_id(
             database.Company.company_name.ilike(f"%{search.strip()}%")
         )
 
-    total_count = query.with_entities(func.count()).scalar()
-    results = query.offset(offset).limit(limit).all()
-    companies = fetch_companies_with_liked(db, [company.id for _, company in results])
+    total_count, total_is_exact = CountService.count(
+        db,
+        query,
+        count_strategy,
+        collection_id=collection_id,
+        cache_key=("search", search.strip().lower()),
+    )
+
+    collection_name = (
+        db.query(database.CompanyCollection.collection_name)
+        .filter(database.CompanyCollection.id == collection_id)
+        .scalar()
+    )
+    if collection_name is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+
+    # Already shaped rows: serialize directly, skipping response_model validation
+    return FastJSONResponse({
+        "id": collection_id,
+        "collection_name": collection_name,
+        "companies": fetch_company_page(db, offset, limit, collection_id, search),
+        "total": total_count,
+        "total_is_exact": total_is_exact,
+        "change_seq": change_seq,
+    })
 
-    collection = db.query(database.CompanyCollection).get(collection_id)
+
+@router.get("/{collection_id}/changes", response_model=CollectionChangesOutput)
+def get_collection_changes(
+    collection_id: uuid.UUID,
+    since: int = Query(
+        ..., ge=0, description="change_seq of the page, or seq of the last changes"
+    ),
+    db: Session = Depends(database.get_read_db),
+) -> CollectionChangesOutput:
+    """Membership changes to apply to already loaded pages."""
+    if db.query(database.CompanyCollection).get(collection_id) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
     
-    return CompanyCollectionOutput(
-        id=collection_id,
-        collection_name=collection.collection_name,
-        companies=companies,
-        total=total_count,
+    page = ChangeFeedService.changes_since(db, collection_id, since)
+    return CollectionChangesOutput(
+        collection_id=collection_id,
+        seq=page.seq,
+        snapshot_required=page.snapshot_required,
+        changes=[
+            CollectionChangeOutput(
+                seq=change.seq, company_id=change.company_id, action=change.action
+            )
+            for change in page.changes
+        ],
     )
 
 
@@ -136,58 +221,90 @@ def get_company_collection_by_id(
 def transfer_companies(
     collection_id: uuid.UUID,
     request: TransferRequest,
+    response: Response,
+    http_request: Request,
     db: Session = Depends(database.get_db),
 ) -> TransferResponse:
     """Transfer companies from one collection to another."""
+    database.mark_client_write(response)
+
     # Validate collections exist
     validate_collections_exist(db, collection_id, request.dest_collection_id)
+    if request.dest_collection_id == collection_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Source and destination collections must differ",
+        )
     
-    # Determine company IDs to transfer
-    company_ids = request.company_ids
-    if request.transfer_all:
-        company_ids = get_company_ids_for_collection(db, collection_id)
+    # Plan: count the companies that really need a (throttled) insert
+    selection = request.resolved_selection()
+    plan = TransferJobService.plan_transfer(
+        db, collection_id, request.dest_collection_id, selection
+    )
+    plan_output = TransferPlanOutput(
+        requested=plan.requested,
+        missing_from_source=plan.missing_from_source,
+        already_in_destination=plan.already_in_destination,
+        to_move=plan.to_move,
+    )
     
-    if not company_ids:
+    if not plan.to_move and not plan.already_in_destination:
         return TransferResponse(
             status="completed",
-            message="No companies to transfer"
+            message="No companies to transfer",
+            plan=plan_output,
         )
     
-    # Small batch - process immediately
-    if len(company_ids) <= SMALL_BATCH_THRESHOLD:
+    # Decide sync vs background on the real work, not the requested count:
+    # source deletes for companies already in the destination count too
+    work = plan.to_move + plan.already_in_destination
+    run_in_background = work > SMALL_BATCH_THRESHOLD
+    if run_in_background:
+        check_transfer_admission()
+    
+    # Recorded as a job even when run inline, so it is journaled and undoable
+    job_id = TransferJobService.create_transfer_job(
+        db, collection_id, request.dest_collection_id, selection, work
+    )
+    
+    if not run_in_background:
         try:
             TransferJobService.transfer_companies_sync(
-                db, collection_id, company_ids, request.dest_collection_id
+                db, collection_id, selection, request.dest_collection_id, job_id
             )
-            
-            return TransferResponse(
-                status="completed",
-                message=f"Successfully transferred {len(company_ids)} companies"
-            )
-            
         except Exception as e:
             db.rollback()
+            TransferJobService.fail_job(db, job_id, str(e))
             raise HTTPException(status_code=500, detail=f"Transfer failed: {str(e)}")
-    
-    # Large batch - process in background
-    job_id = TransferJobService.create_transfer_job(
-        db, collection_id, request.dest_collection_id, company_ids
-    )
+        
+        return TransferResponse(
+            job_id=job_id,
+            status="completed",
+            message=f"Successfully transferred {work} companies",
+            plan=plan_output,
+        )
     
     TransferJobService.start_background_transfer(
-        job_id, collection_id, request.dest_collection_id, company_ids
+        job_id,
+        collection_id,
+        request.dest_collection_id,
+        selection,
+        user_key=get_user_key(http_request),
+        priority=priority_for(work, selection.all_matching),
     )
     
     return TransferResponse(
         job_id=job_id,
         status="processing",
-        message=f"Started background transfer of {len(company_ids)} companies"
+        message=f"Started background transfer of {work} companies",
+        plan=plan_output,
     )
 
 
 @router.get("/jobs/{job_id}", response_model=JobStatusResponse)
 def get_job_status(
     job_id: str, 
+    response: Response,
     db: Session = Depends(database.get_db)
 ) -> JobStatusResponse:
     """Get status of a transfer job."""
@@ -196,15 +313,81 @@ def get_job_status(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
+    # The client refetches right after seeing completion; keep that on the primary
+    if job.status == "completed":
+        database.mark_client_write(response)
+    
     eta_seconds = None
     if job.status == "processing" and job.progress > 0:
         eta_seconds = calculate_eta_seconds(job.progress, job.total)
     
+    # Counted across all workers from the jobs table
+    queue_position, queue_depth = TransferJobService.queue_status(db, job)
+    wait_seconds = None
+    if job.started_at:
+        wait_seconds = (job.started_at - job.created_at).total_seconds()
+    elif job.status == "pending":
+        wait_seconds = (datetime.utcnow() - job.created_at).total_seconds()
+    
     return JobStatusResponse(
         job_id=job.id,
         status=job.status,
         progress=job.progress,
         total=job.total,
         eta_seconds=eta_seconds,
-        error_message=job.error_message
-    )
\ No newline at end of file
+        error_message=job.error_message,
+        conflicts=job.conflicts or 0,
+        queue_position=queue_position,
+        queue_depth=queue_depth,
+        wait_seconds=wait_seconds,
+    )
+
+
+@router.post("/jobs/{job_id}/undo", response_model=TransferResponse)
+def undo_transfer_job(
+    job_id: str,
+    response: Response,
+    http_request: Request,
+    db: Session = Depends(database.get_db),
+) -> TransferResponse:
+    """Revert exactly the associations a finished job changed."""
+    # Held until create_undo_job commits, so concurrent undos of the same job
+    # queue here and the later one sees the first's undo job
+    job = (
+        db.query(database.TransferJob)
+        .filter(database.TransferJob.id == job_id)
+        .with_for_update()
+        .first()
+    )
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status in ("pending", "processing"):
+        raise HTTPException(status_code=409, detail="Job is still running")
+    
+    existing_undo = db.query(database.TransferJob).filter(
+        database.TransferJob.undo_of_job_id == job_id,
+        database.TransferJob.status != "failed",
+    ).first()
+    if existing_undo:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job was already undone by {existing_undo.id}"
+        )
+    
+    check_transfer_admission()
+    database.mark_client_write(response)
+    
+    undo_job_id = TransferJobService.create_undo_job(db, job)
+    TransferJobService.start_background_undo(
+        undo_job_id,
+        job.source_collection_id,
+        user_key=get_user_key(http_request),
+    )
+    
+    return TransferResponse(
+        job_id=undo_job_id,
+        status="processing",
+        message=f"Started undo of {job_id}"
+    )
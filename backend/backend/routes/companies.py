@@ -1,14 +1,27 @@
+import re
+import uuid
+from typing import Callable, List, Optional
+
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, aliased
 
 from backend.db import database
+from backend.routes.responses import FastJSONResponse
+from backend.services.count_service import CountService, CountStrategy
+from backend.services.typeahead_index import company_name_index, tokenize
 
 router = APIRouter(
     prefix="/companies",
     tags=["companies"],
 )
 
+LIKED_COLLECTION_NAME = "Liked Companies List"
+
+_liked_collection_id: Optional[uuid.UUID] = None
+_liked_collection_id_reliable: Callable[[], bool] = lambda: True
+
 
 class CompanyOutput(BaseModel):
     id: int
@@ -19,6 +32,17 @@ class CompanyOutput(BaseModel):
 class CompanyBatchOutput(BaseModel):
     companies: list[CompanyOutput]
     total: int
+    total_is_exact: bool = True
+
+
+class CompanySuggestion(BaseModel):
+    id: int
+    company_name: str
+
+
+class CompanySuggestionsOutput(BaseModel):
+    suggestions: list[CompanySuggestion]
+    source: str
 
 
 def fetch_companies_with_liked(
@@ -26,7 +50,7 @@ def fetch_companies_with_liked(
 ) -> list[CompanyOutput]:
     liked_list = (
         db.query(database.CompanyCollection)
-        .filter(database.CompanyCollection.collection_name == "Liked Companies List")
+        .filter(database.CompanyCollection.collection_name == LIKED_COLLECTION_NAME)
         .first()
     )
 
@@ -57,20 +81,149 @@ def fetch_companies_with_liked(
     ]
 
 
+def get_liked_collection_id(db: Session) -> Optional[uuid.UUID]:
+    """Id of the liked-companies collection, looked up once per process.
+
+    Looked up on every call while the reliability check fails.
+    """
+    global _liked_collection_id
+    if not _liked_collection_id_reliable():
+        _liked_collection_id = None
+    if _liked_collection_id is None:
+        _liked_collection_id = (
+            db.query(database.CompanyCollection.id)
+            .filter(database.CompanyCollection.collection_name == LIKED_COLLECTION_NAME)
+            .limit(1)
+            .scalar()
+        )
+    return _liked_collection_id
+
+
+def set_liked_collection_reliability_check(is_reliable: Callable[[], bool]) -> None:
+    """Stop trusting the cached liked-collection id whenever ``is_reliable()`` is false."""
+    global _liked_collection_id_reliable
+    _liked_collection_id_reliable = is_reliable
+
+
+def reset_liked_collection_id() -> None:
+    """Forget the cached liked-collection id so the next request looks it up."""
+    global _liked_collection_id
+    _liked_collection_id = None
+
+
+def fetch_company_page(
+    db: Session,
+    offset: int,
+    limit: int,
+    collection_id: Optional[uuid.UUID] = None,
+    search: str = "",
+) -> list[dict]:
+    """Load one page of ``{id, company_name, liked}`` dicts in a single query.
+
+    Selects plain columns rather than ORM entities and derives ``liked``
+    from an outer join, so no second lookup or per-row model is needed.
+    """
+    liked = aliased(database.CompanyCollectionAssociation)
+    query = db.query(
+        database.Company.id,
+        database.Company.company_name,
+        liked.company_id.isnot(None),
+    )
+
+    if collection_id is not None:
+        query = (
+            query.join(
+                database.CompanyCollectionAssociation,
+                database.CompanyCollectionAssociation.company_id == database.Company.id,
+            )
+            .filter(database.CompanyCollectionAssociation.collection_id == collection_id)
+            .order_by(database.CompanyCollectionAssociation.id)
+        )
+    else:
+        query = query.order_by(database.Company.id)
+
+    query = query.outerjoin(
+        liked,
+        and_(
+            liked.company_id == database.Company.id,
+            liked.collection_id == get_liked_collection_id(db),
+        ),
+    )
+
+    if search.strip():
+        query = query.filter(database.Company.company_name.ilike(f"%{search.strip()}%"))
+
+    return [
+        {"id": company_id, "company_name": company_name, "liked": is_liked}
+        for company_id, company_name, is_liked in query.offset(offset).limit(limit)
+    ]
+
+
 @router.get("", response_model=CompanyBatchOutput)
 def get_companies(
     offset: int = Query(
         0, description="The number of items to skip from the beginning"
     ),
     limit: int = Query(10, description="The number of items to fetch"),
-    db: Session = Depends(database.get_db),
+    count_strategy: CountStrategy = Query(
+        CountStrategy.EXACT, description="How to compute the total count"
+    ),
+    db: Session = Depends(database.get_read_db),
 ):
-    results = db.query(database.Company).offset(offset).limit(limit).all()
+    count, count_is_exact = CountService.count(
+        db,
+        db.query(database.Company),
+        count_strategy,
+        cache_key="companies",
+        table_name=database.Company.__tablename__,
+    )
+
+    return FastJSONResponse({
+        "companies": fetch_company_page(db, offset, limit),
+        "total": count,
+        "total_is_exact": count_is_exact,
+    })
 
-    count = db.query(database.Company).count()
-    companies = fetch_companies_with_liked(db, [company.id for company in results])
 
-    return CompanyBatchOutput(
-        companies=companies,
-        total=count,
+def word_prefix_filters(column, prefixes: List[str]) -> list:
+    """SQL for the index's rule: each prefix starts some word of ``column``."""
+    return [
+        # Non-word characters escaped; a word follows the start or whitespace
+        column.op("~*")("(^|\\s)" + re.sub(r"(\W)", r"\\\1", prefix))
+        for prefix in prefixes
+    ]
+
+
+@router.get("/typeahead", response_model=CompanySuggestionsOutput)
+def get_company_suggestions(
+    q: str = Query(..., description="Name prefix; every word matches a word prefix"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum suggestions"),
+    collection_id: Optional[uuid.UUID] = Query(
+        None, description="Only suggest members of this collection"
+    ),
+    db: Session = Depends(database.get_read_db),
+):
+    if company_name_index.can_search(collection_id):
+        matches = company_name_index.search(q, limit, collection_id=collection_id, db=db)
+        source = "index"
+    else:
+        # Index still loading after startup, or its membership sets can't be
+        # trusted right now: answer from the database
+        prefixes = tokenize(q)
+        query = db.query(database.Company.id, database.Company.company_name).filter(
+            *word_prefix_filters(database.Company.company_name, prefixes)
+        )
+        if collection_id:
+            query = query.join(database.CompanyCollectionAssociation).filter(
+                database.CompanyCollectionAssociation.collection_id == collection_id
+            )
+        matches = query.order_by(database.Company.id).limit(limit).all() if prefixes else []
+        source = "database"
+
+    return CompanySuggestionsOutput(
+        suggestions=[
+            CompanySuggestion(id=company_id, company_name=company_name)
+            for company_id, company_name in matches
+        ],
+        source=source,
     )
@@ -0,0 +1,36 @@
+"""Liveness and readiness probes for load balancers and orchestrators."""
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from backend.db import database
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/healthz")
+def liveness() -> dict:
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+def readiness(request: Request):
+    """Readiness: startup finished and the primary and read databases answer."""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "starting",
+                "detail": getattr(request.app.state, "startup_error", None),
+            },
+        )
+
+    try:
+        database.ping_engines()
+    except Exception as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "detail": str(e)},
+        )
+
+    return {"status": "ready"}
@@ -0,0 +1,18 @@
+"""Response classes shared by the API routes."""
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+
+class FastJSONResponse(Response):
+    """JSON response serialized straight to bytes, bypassing response_model.
+
+    Routes return this with plain dicts/lists they have already shaped, so
+    FastAPI skips re-validating the payload against ``response_model``
+    (which still documents the schema).
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
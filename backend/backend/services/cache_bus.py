@@ -0,0 +1,142 @@
+"""Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Mutations call ``publish`` inside their transaction; Postgres delivers the
+collection id to every listening worker only if and when that transaction
+commits. Each worker runs one ``InvalidationListener``
+thread that hands events from other processes to its subscribers (the
+publishing process has already updated its own caches).
+
+Staleness bounds:
+
+- while the listener is connected, a cache is stale for no longer than
+  the NOTIFY delivery lag (typically milliseconds);
+- if the listener has not confirmed its connection for
+  ``MAX_STALENESS_SECONDS``, ``healthy`` turns false so caches that check
+  it are bypassed, and every subscriber is flushed on disconnect and
+  again after reconnecting, since events sent in between are lost;
+- the listener's own connection times out unacknowledged sends and idle
+  dead peers (``LISTENER_CONNECT_ARGS``), so a hung network turns into a
+  disconnect and a flush instead of a thread blocked forever.
+"""
+import select
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+CHANNEL = "harmonic_cache_invalidation"
+
+MAX_STALENESS_SECONDS = 5.0
+POLL_TIMEOUT_SECONDS = 1.0
+RECONNECT_DELAY_SECONDS = 1.0
+
+# libpq options for the dedicated LISTEN connection (ignored over Unix sockets)
+LISTENER_CONNECT_ARGS = {
+    "keepalives": 1,
+    "keepalives_idle": 5,
+    "keepalives_interval": 1,
+    "keepalives_count": 3,
+    "tcp_user_timeout": int(MAX_STALENESS_SECONDS * 1000),
+}
+
+# Distinguishes this process's own events, which it has already applied
+PROCESS_TOKEN = uuid.uuid4().hex
+
+# Receives a collection id, or None meaning "flush everything"
+Subscriber = Callable[[Optional[uuid.UUID]], None]
+
+
+def publish(db: Session, *collection_ids: uuid.UUID) -> None:
+    """Announce that ``collection_ids`` changed, on commit of ``db``'s transaction."""
+    for collection_id in sorted(set(collection_ids), key=str):
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CHANNEL, "payload": f"{PROCESS_TOKEN}:{collection_id}"},
+        )
+
+
+class InvalidationListener:
+    """Background LISTEN loop that forwards remote invalidations to subscribers."""
+
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+        self._last_confirmed = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def healthy(self) -> bool:
+        """True while the connection was confirmed within the staleness bound."""
+        return time.monotonic() - self._last_confirmed < MAX_STALENESS_SECONDS
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    def start(self, engine: Engine) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, args=(engine,), name="cache-invalidation", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self, engine: Engine) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen(engine)
+            except Exception as e:
+                print(f"Cache invalidation listener disconnected: {e}")
+            self._last_confirmed = 0.0
+            self._notify(None)
+            self._stop.wait(RECONNECT_DELAY_SECONDS)
+
+    def _listen(self, engine: Engine) -> None:
+        # A dedicated DBAPI connection outside the pool, with its own timeouts
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        conn = engine.dialect.connect(*cargs, **{**cparams, **LISTENER_CONNECT_ARGS})
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            # Anything published before LISTEN took effect was missed
+            self._notify(None)
+
+            while not self._stop.is_set():
+                self._last_confirmed = time.monotonic()
+                readable, _, _ = select.select([conn], [], [], POLL_TIMEOUT_SECONDS)
+                if not readable:
+                    # Idle: cheap round-trip proves the connection is still alive
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+
+                conn.poll()
+                while conn.notifies:
+                    self._handle(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def _handle(self, payload: str) -> None:
+        try:
+            token, collection_id = payload.split(":")
+            collection_id = uuid.UUID(collection_id)
+        except ValueError:
+            return
+        if token != PROCESS_TOKEN:
+            self._notify(collection_id)
+
+    def _notify(self, collection_id: Optional[uuid.UUID]) -> None:
+        for subscriber in self._subscribers:
+            try:
+                subscriber(collection_id)
+            except Exception as e:
+                print(f"Cache invalidation subscriber failed: {e}")
+
+
+invalidation_listener = InvalidationListener()
@@ -0,0 +1,237 @@
+"""Total-count strategies for paginated listings."""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from enum import Enum
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Query, Session
+
+from backend.db import database
+
+# Upper bound on how long a cached count may be served without a mutation
+# invalidating it (e.g. writes made by another worker process).
+COUNT_CACHE_TTL_SECONDS = 30
+
+# Keys include the search term, so bound the entry count as well
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+_CacheKey = Tuple[Optional[uuid.UUID], Hashable]
+
+
+class CountStrategy(str, Enum):
+    """How a listing computes its ``total``."""
+    EXACT = "exact"
+    CACHED = "cached"
+    ESTIMATED = "estimated"
+
+
+class CountCache:
+    """Thread-safe in-process cache of exact counts keyed per collection.
+
+    Entries are kept in insertion order, so expired ones are always at the
+    front and ``put`` evicts them (and the oldest beyond ``max_entries``)
+    in amortized constant time.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = COUNT_CACHE_TTL_SECONDS,
+        max_entries: int = COUNT_CACHE_MAX_ENTRIES,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[_CacheKey, Tuple[int, float]]" = OrderedDict()
+        # Bumped on every invalidation, so a count computed before a write
+        # that committed meanwhile is never stored
+        self._generations: Dict[Optional[uuid.UUID], int] = {}
+        self._epoch = 0
+        # Primary WAL positions a replica must have replayed before its
+        # counts may be stored; None means "invalidated, not yet read".
+        # Unknown at startup, so the global fence starts out pending too.
+        self._fences: Dict[Optional[uuid.UUID], Optional[int]] = {}
+        self._global_fence: Optional[int] = None
+        self._lock = threading.Lock()
+        self._is_reliable: Callable[[], bool] = lambda: True
+
+    def set_reliability_check(self, is_reliable: Callable[[], bool]) -> None:
+        """Bypass the cache whenever ``is_reliable()`` is false.
+
+        Used to stop serving cached counts while cross-worker invalidations
+        might be getting lost.
+        """
+        self._is_reliable = is_reliable
+
+    def get(self, collection_id: Optional[uuid.UUID], key: Hashable) -> Optional[int]:
+        if not self._is_reliable():
+            return None
+        with self._lock:
+            entry = self._entries.get((collection_id, key))
+        if entry is None:
+            return None
+        count, stored_at = entry
+        if time.monotonic() - stored_at > self._ttl_seconds:
+            return None
+        return count
+
+    def generation(self, collection_id: Optional[uuid.UUID]) -> Tuple[int, int]:
+        """Token to take before counting and hand back to ``put``."""
+        with self._lock:
+            return self._epoch, self._generations.get(collection_id, 0)
+
+    def fence(
+        self,
+        collection_id: Optional[uuid.UUID],
+        generation: Tuple[int, int],
+        primary_lsn: Callable[[], int],
+    ) -> int:
+        """WAL position covering every invalidation of ``collection_id`` so far.
+
+        Reads ``primary_lsn()`` at most once per invalidation; any position
+        read after an invalidation is at or past the commit that caused it.
+        """
+        with self._lock:
+            fences = (self._global_fence, self._fences.get(collection_id, 0))
+        if None not in fences:
+            return max(fences)
+
+        lsn = primary_lsn()
+        with self._lock:
+            if generation == (self._epoch, self._generations.get(collection_id, 0)):
+                if self._global_fence is None:
+                    self._global_fence = lsn
+                if collection_id in self._fences and self._fences[collection_id] is None:
+                    self._fences[collection_id] = lsn
+        return lsn
+
+    def put(
+        self,
+        collection_id: Optional[uuid.UUID],
+        key: Hashable,
+        count: int,
+        generation: Tuple[int, int],
+    ) -> None:
+        """Store ``count`` unless the collection was invalidated since ``generation``."""
+        now = time.monotonic()
+        with self._lock:
+            if generation != (self._epoch, self._generations.get(collection_id, 0)):
+                return
+            self._entries[(collection_id, key)] = (count, now)
+            self._entries.move_to_end((collection_id, key))
+
+            while self._entries:
+                _, (_, stored_at) = next(iter(self._entries.items()))
+                if (
+                    len(self._entries) <= self._max_entries
+                    and now - stored_at <= self._ttl_seconds
+                ):
+                    break
+                self._entries.popitem(last=False)
+
+    def invalidate(self, collection_id: uuid.UUID) -> None:
+        """Drop every cached count scoped to ``collection_id``."""
+        with self._lock:
+            self._generations[collection_id] = self._generations.get(collection_id, 0) + 1
+            self._fences[collection_id] = None
+            for entry_key in [k for k in self._entries if k[0] == collection_id]:
+                del self._entries[entry_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._fences.clear()
+            self._global_fence = None
+
+
+count_cache = CountCache()
+
+
+class CountService:
+    """Computes listing totals according to a ``CountStrategy``."""
+
+    @staticmethod
+    def count(
+        db: Session,
+        query: Query,
+        strategy: CountStrategy,
+        collection_id: Optional[uuid.UUID] = None,
+        cache_key: Hashable = None,
+        table_name: Optional[str] = None,
+    ) -> Tuple[int, bool]:
+        """Return ``(total, is_exact)`` for the rows matched by ``query``.
+
+        ``table_name`` marks an unfiltered listing over a whole table, which
+        the estimated strategy answers from ``pg_class`` statistics; all
+        other queries are estimated from the planner's ``EXPLAIN`` rows.
+        """
+        if strategy == CountStrategy.ESTIMATED:
+            estimate = (
+                CountService._table_estimate(db, table_name)
+                if table_name
+                else CountService._explain_estimate(db, query)
+            )
+            if estimate is not None:
+                return estimate, False
+            # No statistics yet (never analyzed): fall through to an exact count
+
+        if strategy == CountStrategy.CACHED:
+            cached = count_cache.get(collection_id, cache_key)
+            if cached is not None:
+                return cached, True
+            generation = count_cache.generation(collection_id)
+            # A lagging replica could re-cache a count from before the last
+            # invalidation: only store it if the replica had replayed past
+            # the invalidation before counting
+            cacheable = db.get_bind() is database.engine or (
+                CountService._replayed_lsn(db)
+                >= count_cache.fence(collection_id, generation, CountService._primary_lsn)
+            )
+
+        total = query.order_by(None).count()
+
+        if strategy == CountStrategy.CACHED and cacheable:
+            count_cache.put(collection_id, cache_key, total, generation)
+        return total, True
+
+    @staticmethod
+    def _primary_lsn() -> int:
+        with database.engine.connect() as conn:
+            return int(conn.execute(text("SELECT pg_current_wal_lsn() - '0/0'")).scalar())
+
+    @staticmethod
+    def _replayed_lsn(db: Session) -> int:
+        """WAL position the session's server has applied (its own, if a primary)."""
+        return int(db.execute(text(
+            "SELECT coalesce(pg_last_wal_replay_lsn(), pg_current_wal_lsn()) - '0/0'"
+        )).scalar())
+
+    @staticmethod
+    def _table_estimate(db: Session, table_name: str) -> Optional[int]:
+        reltuples = db.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": table_name},
+        ).scalar()
+        if reltuples is None or reltuples < 0:
+            return None
+        return int(reltuples)
+
+    @staticmethod
+    def _explain_estimate(db: Session, query: Query) -> Optional[int]:
+        compiled = query.order_by(None).statement.compile(dialect=db.get_bind().dialect)
+        params = {
+            name: str(value) if isinstance(value, uuid.UUID) else value
+            for name, value in compiled.params.items()
+        }
+        plan = db.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        try:
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except (KeyError, IndexError, TypeError):
+            return None
@@ -0,0 +1,319 @@
+"""Admission control and priority scheduling for background transfer jobs.
+
+Jobs wait in an in-process queue and run on worker threads under a total
+and a per-destination concurrency cap. The next job to start is the one
+with the best ``(priority, running jobs of its user, arrival order)`` key
+whose destination has a free slot, so small interactive transfers overtake
+bulk "all matching" jobs and one user's backlog can't starve another's.
+
+The same two caps are also enforced across all API worker processes: a
+started job first takes one of ``MAX_CONCURRENT_TRANSFERS`` global slots
+and one of its destination's slots, held as Postgres session advisory
+locks, and waits (still ``pending``) until both are free. Priority order
+applies within a process; the backlog limit (``MAX_QUEUED_TRANSFERS``)
+bounds each process's in-memory queue.
+
+Each process also holds a ``WorkerLease`` while it runs. Jobs record the
+lease of the process that queued them, so a pending job whose lease is gone
+was lost with its process's memory and can be adopted by another worker.
+"""
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from backend.db import database
+
+MAX_CONCURRENT_TRANSFERS = int(os.getenv("MAX_CONCURRENT_TRANSFERS", "4"))
+MAX_CONCURRENT_TRANSFERS_PER_DESTINATION = int(
+    os.getenv("MAX_CONCURRENT_TRANSFERS_PER_DESTINATION", "2")
+)
+MAX_QUEUED_TRANSFERS = int(os.getenv("MAX_QUEUED_TRANSFERS", "50"))
+
+# Explicit selections up to this size are scheduled as interactive work
+INTERACTIVE_MAX_COMPANIES = 500
+
+# Starting guess for job duration until real jobs have been timed
+DEFAULT_JOB_SECONDS = 30.0
+
+# First keys of pg_try_advisory_lock(namespace, slot) for the global slots
+TRANSFER_SLOT_NAMESPACE = 7_202_604
+DESTINATION_SLOT_NAMESPACE = 7_202_605
+SLOT_POLL_SECONDS = 0.5
+
+# pg_advisory_lock(namespace, key) held by each live worker process
+WORKER_LEASE_NAMESPACE = 7_202_606
+WORKER_LEASE_CHECK_SECONDS = 5.0
+
+
+class TransferPriority(IntEnum):
+    """Lower values are scheduled first."""
+    INTERACTIVE = 0
+    BULK = 1
+
+
+def priority_for(company_count: int, all_matching: bool) -> TransferPriority:
+    if all_matching or company_count > INTERACTIVE_MAX_COMPANIES:
+        return TransferPriority.BULK
+    return TransferPriority.INTERACTIVE
+
+
+class TransferQueueFullError(Exception):
+    """Raised when the backlog is at capacity; retry after ``retry_after_seconds``."""
+
+    def __init__(self, retry_after_seconds: int):
+        super().__init__(f"Transfer queue is full; retry in {retry_after_seconds}s")
+        self.retry_after_seconds = retry_after_seconds
+
+
+@dataclass
+class _QueuedTransfer:
+    job_id: str
+    dest_collection_id: uuid.UUID
+    user_key: str
+    priority: TransferPriority
+    sequence: int
+    run: Callable[[], None]
+
+
+class GlobalTransferSlots:
+    """Cross-process concurrency caps held as session advisory locks.
+
+    Each running job holds one dedicated autocommit connection, so the locks
+    are released when the job ends, or when its process dies.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        max_concurrent: int = MAX_CONCURRENT_TRANSFERS,
+        max_per_destination: int = MAX_CONCURRENT_TRANSFERS_PER_DESTINATION,
+    ):
+        self._engine = engine
+        self._max_concurrent = max_concurrent
+        self._max_per_destination = max_per_destination
+
+    @contextmanager
+    def hold(self, dest_collection_id: uuid.UUID) -> Iterator[None]:
+        """Block until a global and a destination slot are free; hold both."""
+        conn = self._engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            while not self._try_acquire(conn, dest_collection_id):
+                time.sleep(SLOT_POLL_SECONDS)
+            yield
+        finally:
+            try:
+                conn.execute(text("SELECT pg_advisory_unlock_all()"))
+            finally:
+                conn.close()
+
+    def _try_acquire(self, conn: Connection, dest_collection_id: uuid.UUID) -> bool:
+        global_slot = self._try_lock_slot(
+            conn, "SELECT pg_try_advisory_lock(:namespace, :slot)",
+            self._max_concurrent, {"namespace": TRANSFER_SLOT_NAMESPACE},
+        )
+        if global_slot is None:
+            return False
+
+        destination_slot = self._try_lock_slot(
+            conn,
+            "SELECT pg_try_advisory_lock("
+            ":namespace, hashtext(:dest_id || ':' || :slot))",
+            self._max_per_destination,
+            {"namespace": DESTINATION_SLOT_NAMESPACE, "dest_id": str(dest_collection_id)},
+        )
+        if destination_slot is None:
+            conn.execute(
+                text("SELECT pg_advisory_unlock(:namespace, :slot)"),
+                {"namespace": TRANSFER_SLOT_NAMESPACE, "slot": global_slot},
+            )
+            return False
+        return True
+
+    @staticmethod
+    def _try_lock_slot(
+        conn: Connection, statement: str, slots: int, params: dict
+    ) -> Optional[int]:
+        for slot in range(slots):
+            if conn.execute(text(statement), {**params, "slot": slot}).scalar():
+                return slot
+        return None
+
+
+class WorkerLease:
+    """This process's claim on the jobs it queued, as a session advisory lock.
+
+    Held on a dedicated connection that is checked every few seconds and
+    re-taken if it drops, so the lock disappears when the process dies.
+    """
+
+    def __init__(self):
+        self.key = random.randrange(1, 2**31)
+        self._held = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, engine: Engine, timeout: float = 10.0) -> bool:
+        """Take the lease on a background thread; True once it is held."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._hold, args=(engine,), name="worker-lease", daemon=True
+            )
+            self._thread.start()
+        return self._held.wait(timeout)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=WORKER_LEASE_CHECK_SECONDS)
+            self._thread = None
+
+    def _hold(self, engine: Engine) -> None:
+        while not self._stop.is_set():
+            try:
+                conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+                try:
+                    conn.execute(
+                        text("SELECT pg_advisory_lock(:namespace, :key)"),
+                        {"namespace": WORKER_LEASE_NAMESPACE, "key": self.key},
+                    )
+                    self._held.set()
+                    while not self._stop.wait(WORKER_LEASE_CHECK_SECONDS):
+                        conn.execute(text("SELECT 1"))
+                finally:
+                    self._held.clear()
+                    conn.close()
+            except Exception as e:
+                print(f"Worker lease lost, retaking: {e}")
+                self._stop.wait(WORKER_LEASE_CHECK_SECONDS)
+
+
+class TransferScheduler:
+    """Runs transfer jobs on a bounded set of threads in priority order."""
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_TRANSFERS,
+        max_per_destination: int = MAX_CONCURRENT_TRANSFERS_PER_DESTINATION,
+        max_queued: int = MAX_QUEUED_TRANSFERS,
+        global_slots: Optional[GlobalTransferSlots] = None,
+    ):
+        self._global_slots = global_slots
+        self._max_concurrent = max_concurrent
+        self._max_per_destination = max_per_destination
+        self._max_queued = max_queued
+        self._lock = threading.Lock()
+        self._pending: List[_QueuedTransfer] = []
+        self._running = 0
+        self._running_per_destination: Dict[uuid.UUID, int] = {}
+        self._running_per_user: Dict[str, int] = {}
+        self._sequence = 0
+        self._avg_job_seconds = DEFAULT_JOB_SECONDS
+
+    def check_admission(self) -> None:
+        """Raise ``TransferQueueFullError`` if no more jobs may be queued."""
+        with self._lock:
+            if len(self._pending) >= self._max_queued:
+                raise TransferQueueFullError(self._retry_after_locked())
+
+    def submit(
+        self,
+        job_id: str,
+        dest_collection_id: uuid.UUID,
+        user_key: str,
+        priority: TransferPriority,
+        run: Callable[[], None],
+    ) -> None:
+        """Queue ``run`` for execution; starts immediately if a slot is free."""
+        with self._lock:
+            self._sequence += 1
+            self._pending.append(
+                _QueuedTransfer(
+                    job_id=job_id,
+                    dest_collection_id=dest_collection_id,
+                    user_key=user_key,
+                    priority=priority,
+                    sequence=self._sequence,
+                    run=run,
+                )
+            )
+            self._dispatch_locked()
+
+    def _order_key(self, entry: _QueuedTransfer):
+        return (
+            entry.priority,
+            self._running_per_user.get(entry.user_key, 0),
+            entry.sequence,
+        )
+
+    def _dispatch_locked(self) -> None:
+        while self._running < self._max_concurrent:
+            eligible = [
+                entry
+                for entry in self._pending
+                if self._running_per_destination.get(entry.dest_collection_id, 0)
+                < self._max_per_destination
+            ]
+            if not eligible:
+                return
+
+            entry = min(eligible, key=self._order_key)
+            self._pending.remove(entry)
+            self._running += 1
+            self._running_per_destination[entry.dest_collection_id] = (
+                self._running_per_destination.get(entry.dest_collection_id, 0) + 1
+            )
+            self._running_per_user[entry.user_key] = (
+                self._running_per_user.get(entry.user_key, 0) + 1
+            )
+
+            thread = threading.Thread(
+                target=self._run, args=(entry,), name=f"transfer-{entry.job_id}"
+            )
+            thread.daemon = True
+            thread.start()
+
+    def _run(self, entry: _QueuedTransfer) -> None:
+        started = time.monotonic()
+        try:
+            if self._global_slots is None:
+                entry.run()
+            else:
+                with self._global_slots.hold(entry.dest_collection_id):
+                    entry.run()
+        except Exception as e:
+            print(f"Transfer job {entry.job_id} could not run: {e}")
+        finally:
+            with self._lock:
+                elapsed = time.monotonic() - started
+                self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+
+                self._running -= 1
+                self._decrement(self._running_per_destination, entry.dest_collection_id)
+                self._decrement(self._running_per_user, entry.user_key)
+                self._dispatch_locked()
+
+    @staticmethod
+    def _decrement(counts: dict, key) -> None:
+        counts[key] -= 1
+        if counts[key] <= 0:
+            del counts[key]
+
+    def _retry_after_locked(self) -> int:
+        # Time for the running slots to drain the backlog ahead of a new job
+        waves = len(self._pending) / max(self._max_concurrent, 1)
+        return max(1, math.ceil(waves * self._avg_job_seconds))
+
+
+transfer_scheduler = TransferScheduler(global_slots=GlobalTransferSlots(database.engine))
+worker_lease = WorkerLease()
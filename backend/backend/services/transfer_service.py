@@ -1,25 +1,189 @@
 """Service layer for handling company transfer operations."""
 import json
-import threading
+import random
+import time
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 
-from sqlalchemy import and_
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 
 from backend.db import database
+from backend.models.transfer import CompanySelection
+from backend.services import cache_bus
+from backend.services.count_service import count_cache
+from backend.services.transfer_scheduler import (
+    WORKER_LEASE_NAMESPACE,
+    TransferPriority,
+    priority_for,
+    transfer_scheduler,
+    worker_lease,
+)
+from backend.services.typeahead_index import company_name_index
+
+# Companies (or journal entries, for undo) handled per transaction. Also
+# bounds how many advisory locks one transaction holds, and is the page size
+# when resolving a selection.
+TRANSFER_CHUNK_SIZE = 25
+
+# A chunk that deadlocks or fails serialization is retried with jittered
+# exponential backoff this many times before the job fails.
+MAX_CHUNK_RETRIES = 5
+CHUNK_RETRY_BASE_DELAY_SECONDS = 0.05
+
+# First key of pg_advisory_xact_lock(namespace, company_id)
+COMPANY_LOCK_NAMESPACE = 7_202_602
+
+# serialization_failure, deadlock_detected, unique_violation
+RETRYABLE_SQLSTATES = {"40001", "40P01", "23505"}
+
+# True while the process that queued job ``j`` still holds its WorkerLease
+LEASE_HELD_SQL = """EXISTS (
+    SELECT 1 FROM pg_locks l
+    WHERE l.locktype = 'advisory' AND l.granted
+      AND l.database = (SELECT oid FROM pg_database WHERE datname = current_database())
+      AND l.classid = :lease_namespace
+      AND l.objid = CAST(j.worker_lease AS oid)
+      AND l.objsubid = 2
+)"""
+
+T = TypeVar("T")
+
+
+class TransferConflictError(Exception):
+    """Raised when a chunk still conflicts after ``MAX_CHUNK_RETRIES`` retries."""
+
+
+@dataclass
+class TransferPlan:
+    """Selected companies counted by the work a transfer really needs."""
+    requested: int = 0
+    missing_from_source: int = 0
+    # In both collections: only the (cheap) source delete is needed
+    already_in_destination: int = 0
+    # In the source but not the destination: the throttled inserts
+    to_move: int = 0
 
 
 class TransferJobService:
     """Service for managing transfer jobs and background processing."""
     
+    @staticmethod
+    def plan_transfer(
+        db: Session,
+        source_collection_id: uuid.UUID,
+        dest_collection_id: uuid.UUID,
+        selection: CompanySelection
+    ) -> TransferPlan:
+        """Count the selection against both collections in one query.
+
+        Only counts leave the database; the companies themselves are
+        resolved again, chunk by chunk, when the transfer runs.
+        """
+        params = {"source_id": source_collection_id, "dest_id": dest_collection_id}
+        join, predicate = TransferJobService._selection_sql(selection, params)
+        
+        row = db.execute(text(f"""
+            WITH selected AS (
+                SELECT a.company_id
+                FROM company_collection_associations a {join}
+                WHERE a.collection_id = :source_id AND {predicate}
+            )
+            SELECT
+                count(*) FILTER (WHERE dst.company_id IS NULL) AS to_move,
+                count(*) FILTER (WHERE dst.company_id IS NOT NULL)
+                    AS already_in_destination,
+                (
+                    SELECT count(DISTINCT i.company_id)
+                    FROM unnest(CAST(:include_ids AS integer[])) AS i(company_id)
+                    WHERE NOT i.company_id = ANY(CAST(:exclude_ids AS integer[]))
+                      AND NOT EXISTS (
+                          SELECT 1 FROM company_collection_associations src
+                          WHERE src.collection_id = :source_id
+                            AND src.company_id = i.company_id
+                      )
+                ) AS missing_from_source
+            FROM selected s
+            LEFT JOIN company_collection_associations dst
+              ON dst.company_id = s.company_id AND dst.collection_id = :dest_id
+        """), params).one()
+        
+        return TransferPlan(
+            requested=row.to_move + row.already_in_destination + row.missing_from_source,
+            missing_from_source=row.missing_from_source,
+            already_in_destination=row.already_in_destination,
+            to_move=row.to_move,
+        )
+    
+    @staticmethod
+    def remove_from_source(
+        db: Session,
+        job_id: str,
+        source_collection_id: uuid.UUID,
+        dest_collection_id: uuid.UUID,
+        selection: CompanySelection
+    ) -> int:
+        """Set-based delete of selected companies the destination already has.
+
+        Journaled under ``job_id``, one chunk per transaction; each chunk
+        counts toward the job's progress. The destination membership is
+        checked again after the locks are taken, so an opposing job that
+        removed the company from the destination first can't leave it in
+        neither collection.
+        """
+        job = db.query(database.TransferJob).get(job_id)
+        
+        def remove(chunk: List[int]) -> List[int]:
+            TransferJobService._lock_companies(
+                db, chunk, [source_collection_id, dest_collection_id]
+            )
+            cache_bus.publish(db, source_collection_id)
+            job.progress = (job.progress or 0) + len(chunk)
+            return db.execute(text("""
+                WITH deleted AS (
+                    DELETE FROM company_collection_associations
+                    WHERE collection_id = :source_id
+                      AND company_id = ANY(:company_ids)
+                      AND EXISTS (
+                          SELECT 1 FROM company_collection_associations d
+                          WHERE d.collection_id = :dest_id
+                            AND d.company_id = company_collection_associations.company_id
+                      )
+                    RETURNING company_id
+                ), journaled AS (
+                    INSERT INTO transfer_journal_entries
+                        (job_id, collection_id, company_id, action)
+                    SELECT :job_id, :source_id, company_id, :removed
+                    FROM deleted
+                )
+                SELECT company_id FROM deleted
+            """), {
+                "source_id": source_collection_id,
+                "dest_id": dest_collection_id,
+                "company_ids": chunk,
+                "job_id": job_id,
+                "removed": database.JOURNAL_REMOVED,
+            }).scalars().all()
+        
+        removed = 0
+        for removed_ids in TransferJobService._run_selected_chunks(
+            db, job, source_collection_id, selection, remove,
+            already_in_collection_id=dest_collection_id,
+        ):
+            TransferJobService._after_move(source_collection_id, None, removed_ids, [])
+            removed += len(removed_ids)
+        return removed
+    
     @staticmethod
     def create_transfer_job(
         db: Session,
         source_collection_id: uuid.UUID,
         dest_collection_id: uuid.UUID,
-        company_ids: List[int]
+        selection: CompanySelection,
+        total: int
     ) -> str:
         """Create a new transfer job record."""
         job_id = f"transfer_{uuid.uuid4().hex[:8]}"
@@ -28,64 +192,203 @@ class TransferJobService:
             id=job_id,
             source_collection_id=source_collection_id,
             dest_collection_id=dest_collection_id,
-            company_ids=json.dumps(company_ids),
+            company_ids=json.dumps(selection.include_ids),
+            selection=selection.model_dump_json(),
             status="pending",
             progress=0,
-            total=len(company_ids)
+            total=total,
+            worker_lease=worker_lease.key,
         )
         db.add(job)
         db.commit()
         
         return job_id
     
+    @staticmethod
+    def queue_status(
+        db: Session, job: database.TransferJob
+    ) -> Tuple[Optional[int], int]:
+        """``(position, depth)`` among pending jobs of every live worker.
+
+        Position is by creation time and is None unless ``job`` is pending.
+        Jobs orphaned by a dead worker are left out until one adopts them.
+        """
+        row = db.execute(text(f"""
+            SELECT
+                count(*) FILTER (
+                    WHERE (created_at, id) <= (:created_at, :job_id)
+                ) AS position,
+                count(*) AS depth
+            FROM transfer_jobs j
+            WHERE status = 'pending' AND {LEASE_HELD_SQL}
+        """), {
+            "created_at": job.created_at,
+            "job_id": job.id,
+            "lease_namespace": WORKER_LEASE_NAMESPACE,
+        }).one()
+        position = row.position if job.status == "pending" else None
+        return position, row.depth
+    
+    @staticmethod
+    def requeue_orphaned_jobs(db: Session) -> int:
+        """Adopt pending jobs whose worker died and queue them here.
+
+        Queues live in process memory, so a restart (e.g. ``--reload``)
+        would otherwise leave its jobs ``pending`` forever. Jobs are
+        re-run from their stored selection or journal; returns how many.
+        """
+        job_ids = db.execute(text(f"""
+            UPDATE transfer_jobs SET worker_lease = :lease
+            WHERE id IN (
+                SELECT id FROM transfer_jobs j
+                WHERE status = 'pending' AND NOT {LEASE_HELD_SQL}
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id
+        """), {
+            "lease": worker_lease.key,
+            "lease_namespace": WORKER_LEASE_NAMESPACE,
+        }).scalars().all()
+        db.commit()
+        
+        jobs = db.query(database.TransferJob).filter(
+            database.TransferJob.id.in_(job_ids)
+        ).order_by(database.TransferJob.created_at).all()
+        for job in jobs:
+            if job.kind == "undo":
+                TransferJobService.start_background_undo(job.id, job.dest_collection_id)
+                continue
+            if job.selection:
+                selection = CompanySelection.model_validate_json(job.selection)
+            else:
+                selection = CompanySelection(include_ids=json.loads(job.company_ids or "[]"))
+            TransferJobService.start_background_transfer(
+                job.id,
+                job.source_collection_id,
+                job.dest_collection_id,
+                selection,
+                priority=priority_for(job.total or 0, selection.all_matching),
+            )
+        return len(jobs)
+    
+    @staticmethod
+    def _claim_job(db: Session, job_id: str) -> Optional[database.TransferJob]:
+        """Move a pending job this process owns to processing, or return None.
+
+        Another worker may have adopted the job while this one's lease was
+        briefly lost; only the current owner runs it.
+        """
+        job = db.query(database.TransferJob).filter(
+            database.TransferJob.id == job_id,
+            database.TransferJob.status == "pending",
+            database.TransferJob.worker_lease == worker_lease.key,
+        ).with_for_update().first()
+        if not job:
+            db.rollback()
+            return None
+        
+        job.status = "processing"
+        job.started_at = datetime.utcnow()
+        db.commit()
+        return job
+    
+    @staticmethod
+    def fail_job(db: Session, job_id: str, error_message: str) -> None:
+        """Mark a job failed with the given error."""
+        job = db.query(database.TransferJob).get(job_id)
+        if job:
+            job.status = "failed"
+            job.error_message = error_message
+            job.completed_at = datetime.utcnow()
+            db.commit()
+    
     @staticmethod
     def start_background_transfer(
         job_id: str,
         source_collection_id: uuid.UUID,
         dest_collection_id: uuid.UUID,
-        company_ids: List[int]
+        selection: CompanySelection,
+        user_key: str = "anonymous",
+        priority: TransferPriority = TransferPriority.BULK,
     ) -> None:
-        """Start background processing of transfer job."""
-        thread = threading.Thread(
-            target=TransferJobService._process_transfer_job,
-            args=(job_id, source_collection_id, dest_collection_id, company_ids)
+        """Queue background processing of a transfer job on the scheduler."""
+        transfer_scheduler.submit(
+            job_id,
+            dest_collection_id,
+            user_key,
+            priority,
+            lambda: TransferJobService._process_transfer_job(
+                job_id, source_collection_id, dest_collection_id, selection
+            ),
         )
-        thread.daemon = True
-        thread.start()
     
     @staticmethod
     def _process_transfer_job(
         job_id: str,
         source_collection_id: uuid.UUID,
         dest_collection_id: uuid.UUID,
-        company_ids: List[int]
+        selection: CompanySelection
     ) -> None:
         """Background job to process company transfers."""
         db = database.SessionLocal()
         try:
-            # Update job status to processing
-            job = db.query(database.TransferJob).get(job_id)
+            TransferJobService._run_transfer(
+                db, job_id, source_collection_id, dest_collection_id, selection
+            )
+        finally:
+            db.close()
+    
+    @staticmethod
+    def transfer_companies_sync(
+        db: Session,
+        source_collection_id: uuid.UUID,
+        selection: CompanySelection,
+        dest_collection_id: uuid.UUID,
+        job_id: str
+    ) -> None:
+        """Transfer companies synchronously for small batches."""
+        TransferJobService._run_transfer(
+            db, job_id, source_collection_id, dest_collection_id, selection
+        )
+        
+        job = db.query(database.TransferJob).get(job_id)
+        if job.status == "failed":
+            raise TransferConflictError(job.error_message)
+    
+    @staticmethod
+    def _run_transfer(
+        db: Session,
+        job_id: str,
+        source_collection_id: uuid.UUID,
+        dest_collection_id: uuid.UUID,
+        selection: CompanySelection
+    ) -> None:
+        """Move selected companies chunk by chunk in ascending id order, tracking the job."""
+        job = None
+        try:
+            job = TransferJobService._claim_job(db, job_id)
             if not job:
                 return
-                
-            job.status = "processing"
-            job.started_at = datetime.utcnow()
-            db.commit()
             
-            # Process each company transfer
-            for i, company_id in enumerate(company_ids):
-                try:
-                    TransferJobService._transfer_single_company(
-                        db, company_id, source_collection_id, dest_collection_id
-                    )
-                    
-                    # Update progress
-                    job.progress = i + 1
-                    db.commit()
-                    
-                except Exception as e:
-                    print(f"Error transferring company {company_id}: {e}")
-                    continue
+            # Companies already in the destination only leave the source
+            TransferJobService.remove_from_source(
+                db, job_id, source_collection_id, dest_collection_id, selection
+            )
+            
+            def move(chunk: List[int]) -> Tuple[List[int], List[int]]:
+                moved = TransferJobService._move_chunk(
+                    db, job_id, source_collection_id, dest_collection_id, chunk
+                )
+                # Progress commits atomically with the chunk it describes
+                job.progress = (job.progress or 0) + len(chunk)
+                return moved
+            
+            for removed_ids, added_ids in TransferJobService._run_selected_chunks(
+                db, job, source_collection_id, selection, move
+            ):
+                TransferJobService._after_move(
+                    source_collection_id, dest_collection_id, removed_ids, added_ids
+                )
             
             # Mark job as completed
             job.status = "completed"
@@ -93,58 +396,403 @@ class TransferJobService:
             db.commit()
             
         except Exception as e:
-            # Mark job as failed
+            # Mark job as failed; completed chunks stay applied and journaled
             if job:
+                db.rollback()
                 job.status = "failed"
                 job.error_message = str(e)
+                job.completed_at = datetime.utcnow()
                 db.commit()
             print(f"Transfer job {job_id} failed: {e}")
-        finally:
-            db.close()
     
     @staticmethod
-    def _transfer_single_company(
-        db: Session, 
-        company_id: int, 
+    def _move_chunk(
+        db: Session,
+        job_id: str,
         source_collection_id: uuid.UUID,
-        dest_collection_id: uuid.UUID
-    ) -> None:
-        """Transfer a single company from source to destination collection."""
-        # Remove from source collection
-        db.query(database.CompanyCollectionAssociation).filter(
-            and_(
-                database.CompanyCollectionAssociation.company_id == company_id,
-                database.CompanyCollectionAssociation.collection_id == source_collection_id
+        dest_collection_id: uuid.UUID,
+        company_ids: List[int]
+    ) -> Tuple[List[int], List[int]]:
+        """Move one chunk set-wise; returns ``(removed_ids, added_ids)``.
+
+        Only companies actually deleted from the source are inserted into the
+        destination, and both sides are journaled in the same statement.
+        """
+        TransferJobService._lock_companies(
+            db, company_ids, [source_collection_id, dest_collection_id]
+        )
+        # Delivered to other workers only if this chunk commits
+        cache_bus.publish(db, source_collection_id, dest_collection_id)
+        rows = db.execute(text("""
+            WITH deleted AS (
+                DELETE FROM company_collection_associations
+                WHERE collection_id = :source_id
+                  AND company_id = ANY(:company_ids)
+                RETURNING company_id
+            ), inserted AS (
+                -- Fires the per-row throttle trigger
+                INSERT INTO company_collection_associations (company_id, collection_id)
+                SELECT company_id, :dest_id FROM deleted
+                ON CONFLICT (company_id, collection_id) DO NOTHING
+                RETURNING company_id
+            ), journaled AS (
+                INSERT INTO transfer_journal_entries
+                    (job_id, collection_id, company_id, action)
+                SELECT :job_id, :source_id, company_id, :removed FROM deleted
+                UNION ALL
+                SELECT :job_id, :dest_id, company_id, :added FROM inserted
             )
-        ).delete()
+            SELECT :removed AS action, company_id FROM deleted
+            UNION ALL
+            SELECT :added AS action, company_id FROM inserted
+        """), {
+            "source_id": source_collection_id,
+            "dest_id": dest_collection_id,
+            "company_ids": company_ids,
+            "job_id": job_id,
+            "added": database.JOURNAL_ADDED,
+            "removed": database.JOURNAL_REMOVED,
+        }).all()
         
-        # Check if association already exists in destination
-        existing = db.query(database.CompanyCollectionAssociation).filter(
-            and_(
-                database.CompanyCollectionAssociation.company_id == company_id,
-                database.CompanyCollectionAssociation.collection_id == dest_collection_id
-            )
-        ).first()
+        removed_ids = [
+            company_id for action, company_id in rows
+            if action == database.JOURNAL_REMOVED
+        ]
+        added_ids = [
+            company_id for action, company_id in rows
+            if action == database.JOURNAL_ADDED
+        ]
+        return removed_ids, added_ids
+    
+    @staticmethod
+    def _lock_companies(
+        db: Session,
+        company_ids: List[int],
+        collection_ids: List[uuid.UUID]
+    ) -> None:
+        """Lock companies for the rest of the transaction, in ascending id order.
+
+        Every association writer takes these locks first, so jobs touching
+        overlapping companies (even in opposite directions) queue behind each
+        other instead of deadlocking. The advisory locks also cover rows that
+        do not exist yet; the row locks cover existing associations.
+        """
+        params = {
+            "namespace": COMPANY_LOCK_NAMESPACE,
+            "company_ids": sorted(set(company_ids)),
+            "collection_ids": list(collection_ids),
+        }
+        db.execute(text("""
+            SELECT pg_advisory_xact_lock(:namespace, company_id)
+            FROM (
+                SELECT company_id
+                FROM unnest(CAST(:company_ids AS integer[])) AS company_id
+                ORDER BY company_id
+            ) ordered
+        """), params)
+        db.execute(text("""
+            SELECT 1 FROM company_collection_associations
+            WHERE company_id = ANY(:company_ids)
+              AND collection_id = ANY(CAST(:collection_ids AS uuid[]))
+            ORDER BY company_id, collection_id
+            FOR UPDATE
+        """), params)
+    
+    @staticmethod
+    def _run_chunk(
+        db: Session,
+        job: Optional[database.TransferJob],
+        work: Callable[[], T]
+    ) -> T:
+        """Run and commit ``work`` as one transaction, retrying lock conflicts.
+
+        Each retry is counted in ``job.conflicts`` so it shows in job status.
+        """
+        for attempt in range(MAX_CHUNK_RETRIES + 1):
+            try:
+                result = work()
+                db.commit()
+                return result
+            except DBAPIError as e:
+                db.rollback()
+                sqlstate = getattr(e.orig, "pgcode", None)
+                if sqlstate not in RETRYABLE_SQLSTATES:
+                    raise
+                if attempt == MAX_CHUNK_RETRIES:
+                    raise TransferConflictError(
+                        f"Gave up after {MAX_CHUNK_RETRIES} retries: {e.orig}"
+                    ) from e
+                
+                if job is not None:
+                    job.conflicts = (job.conflicts or 0) + 1
+                    db.commit()
+                time.sleep(
+                    CHUNK_RETRY_BASE_DELAY_SECONDS * (2 ** attempt) * (1 + random.random())
+                )
+    
+    @staticmethod
+    def _selection_sql(selection: CompanySelection, params: Dict) -> Tuple[str, str]:
+        """``(join, predicate)`` over source associations ``a`` for a selection.
+
+        Adds the selection's bind parameters to ``params``.
+        """
+        params["include_ids"] = sorted(set(selection.include_ids))
+        params["exclude_ids"] = sorted(set(selection.exclude_ids))
         
-        if not existing:
-            # Create new association in destination (triggers 100ms throttle)
-            association = database.CompanyCollectionAssociation(
-                company_id=company_id,
-                collection_id=dest_collection_id
-            )
-            db.add(association)
+        join = ""
+        selected = ["a.company_id = ANY(CAST(:include_ids AS integer[]))"]
+        if selection.all_matching:
+            search = selection.search.strip()
+            if search:
+                # Same match as the collection page's search box
+                join = "JOIN companies c ON c.id = a.company_id"
+                selected.append("c.company_name ILIKE :search_pattern")
+                params["search_pattern"] = f"%{search}%"
+            else:
+                selected.append("TRUE")
         
-        db.commit()
+        predicate = (
+            f"({' OR '.join(selected)}) "
+            "AND NOT a.company_id = ANY(CAST(:exclude_ids AS integer[]))"
+        )
+        return join, predicate
     
     @staticmethod
-    def transfer_companies_sync(
+    def _select_chunk(
         db: Session,
         source_collection_id: uuid.UUID,
-        company_ids: List[int],
-        dest_collection_id: uuid.UUID
+        selection: CompanySelection,
+        after_company_id: int,
+        already_in_collection_id: Optional[uuid.UUID] = None
+    ) -> List[int]:
+        """Next page of selected source members after ``after_company_id``.
+
+        ``already_in_collection_id`` narrows the page to companies that
+        collection already has.
+        """
+        params = {
+            "source_id": source_collection_id,
+            "after_company_id": after_company_id,
+            "chunk_size": TRANSFER_CHUNK_SIZE,
+        }
+        join, predicate = TransferJobService._selection_sql(selection, params)
+        if already_in_collection_id is not None:
+            params["other_id"] = already_in_collection_id
+            predicate += """ AND EXISTS (
+                SELECT 1 FROM company_collection_associations other
+                WHERE other.collection_id = :other_id
+                  AND other.company_id = a.company_id
+            )"""
+        
+        return db.execute(text(f"""
+            SELECT a.company_id
+            FROM company_collection_associations a {join}
+            WHERE a.collection_id = :source_id
+              AND a.company_id > :after_company_id
+              AND {predicate}
+            ORDER BY a.company_id
+            LIMIT :chunk_size
+        """), params).scalars().all()
+    
+    @staticmethod
+    def _run_selected_chunks(
+        db: Session,
+        job: Optional[database.TransferJob],
+        source_collection_id: uuid.UUID,
+        selection: CompanySelection,
+        process: Callable[[List[int]], T],
+        already_in_collection_id: Optional[uuid.UUID] = None
+    ) -> Iterator[T]:
+        """Apply ``process`` to the selection, one committed chunk at a time.
+
+        Chunks are resolved with keyset pagination on ``company_id`` inside
+        the chunk's own transaction, so a retry re-reads current membership
+        and the selection is never materialized. Yields each chunk's result
+        after it commits.
+        """
+        after_company_id = 0
+        while True:
+            def work(after_company_id=after_company_id) -> Tuple[List[int], Optional[T]]:
+                chunk = TransferJobService._select_chunk(
+                    db, source_collection_id, selection, after_company_id,
+                    already_in_collection_id,
+                )
+                return chunk, process(chunk) if chunk else None
+            
+            chunk, result = TransferJobService._run_chunk(db, job, work)
+            if not chunk:
+                return
+            after_company_id = chunk[-1]
+            yield result
+    
+    @staticmethod
+    def _after_move(
+        source_collection_id: Optional[uuid.UUID],
+        dest_collection_id: Optional[uuid.UUID],
+        removed_ids: List[int],
+        added_ids: List[int]
     ) -> None:
-        """Transfer companies synchronously for small batches."""
-        for company_id in company_ids:
-            TransferJobService._transfer_single_company(
-                db, company_id, source_collection_id, dest_collection_id
-            )
\ No newline at end of file
+        """Bring in-process caches in line with a committed chunk."""
+        if source_collection_id and removed_ids:
+            TransferJobService._invalidate_caches(source_collection_id)
+            company_name_index.remove_members(source_collection_id, removed_ids)
+        if dest_collection_id and added_ids:
+            TransferJobService._invalidate_caches(dest_collection_id)
+            company_name_index.add_members(dest_collection_id, added_ids)
+    
+    @staticmethod
+    def _invalidate_caches(*collection_ids: uuid.UUID) -> None:
+        for collection_id in collection_ids:
+            count_cache.invalidate(collection_id)
+    
+    @staticmethod
+    def create_undo_job(db: Session, job: database.TransferJob) -> str:
+        """Create a job that reverts exactly the journaled changes of ``job``."""
+        journaled = db.query(database.TransferJournalEntry).filter(
+            database.TransferJournalEntry.job_id == job.id
+        ).count()
+        
+        undo_job_id = f"undo_{uuid.uuid4().hex[:8]}"
+        db.add(database.TransferJob(
+            id=undo_job_id,
+            kind="undo",
+            undo_of_job_id=job.id,
+            source_collection_id=job.dest_collection_id,
+            dest_collection_id=job.source_collection_id,
+            company_ids=json.dumps([]),
+            status="pending",
+            progress=0,
+            total=journaled,
+            worker_lease=worker_lease.key,
+        ))
+        db.commit()
+        
+        return undo_job_id
+    
+    @staticmethod
+    def start_background_undo(
+        undo_job_id: str,
+        dest_collection_id: uuid.UUID,
+        user_key: str = "anonymous",
+        priority: TransferPriority = TransferPriority.INTERACTIVE,
+    ) -> None:
+        """Queue an undo job created by ``create_undo_job`` on the scheduler."""
+        transfer_scheduler.submit(
+            undo_job_id,
+            dest_collection_id,
+            user_key,
+            priority,
+            lambda: TransferJobService._process_undo_job(undo_job_id),
+        )
+    
+    @staticmethod
+    def _process_undo_job(undo_job_id: str) -> None:
+        """Revert a job from its journal with set-based DELETE and INSERT.
+
+        Journal entries are replayed in chunks: associations the original job
+        added are deleted and those it removed are re-inserted (each insert
+        still fires the per-row throttle trigger), under the same company
+        locks and retry policy as transfers. The undo journals its own
+        changes, so it can itself be undone.
+        """
+        db = database.SessionLocal()
+        job = None
+        try:
+            job = TransferJobService._claim_job(db, undo_job_id)
+            if not job:
+                return
+            
+            original_job_id = job.undo_of_job_id
+            after_entry_id = 0
+            while True:
+                entries = db.execute(text("""
+                    SELECT id, company_id FROM transfer_journal_entries
+                    WHERE job_id = :original_job_id AND id > :after_entry_id
+                    ORDER BY id
+                    LIMIT :chunk_size
+                """), {
+                    "original_job_id": original_job_id,
+                    "after_entry_id": after_entry_id,
+                    "chunk_size": TRANSFER_CHUNK_SIZE,
+                }).all()
+                db.commit()
+                if not entries:
+                    break
+                
+                first_entry_id = after_entry_id
+                after_entry_id = entries[-1].id
+                
+                def work(
+                    company_ids=[entry.company_id for entry in entries],
+                    first_entry_id=first_entry_id,
+                    last_entry_id=after_entry_id,
+                    entry_count=len(entries),
+                ) -> None:
+                    TransferJobService._lock_companies(
+                        db, company_ids,
+                        [job.source_collection_id, job.dest_collection_id]
+                    )
+                    cache_bus.publish(
+                        db, job.source_collection_id, job.dest_collection_id
+                    )
+                    db.execute(text("""
+                        WITH entries AS (
+                            SELECT collection_id, company_id, action
+                            FROM transfer_journal_entries
+                            WHERE job_id = :original_job_id
+                              AND id > :first_entry_id AND id <= :last_entry_id
+                        ), deleted AS (
+                            DELETE FROM company_collection_associations a
+                            USING entries e
+                            WHERE e.action = :added
+                              AND a.collection_id = e.collection_id
+                              AND a.company_id = e.company_id
+                            RETURNING a.collection_id, a.company_id
+                        ), inserted AS (
+                            INSERT INTO company_collection_associations
+                                (collection_id, company_id)
+                            SELECT collection_id, company_id FROM entries
+                            WHERE action = :removed
+                            ON CONFLICT (company_id, collection_id) DO NOTHING
+                            RETURNING collection_id, company_id
+                        )
+                        INSERT INTO transfer_journal_entries
+                            (job_id, collection_id, company_id, action)
+                        SELECT :undo_job_id, collection_id, company_id, :removed
+                        FROM deleted
+                        UNION ALL
+                        SELECT :undo_job_id, collection_id, company_id, :added
+                        FROM inserted
+                    """), {
+                        "original_job_id": original_job_id,
+                        "undo_job_id": undo_job_id,
+                        "first_entry_id": first_entry_id,
+                        "last_entry_id": last_entry_id,
+                        "added": database.JOURNAL_ADDED,
+                        "removed": database.JOURNAL_REMOVED,
+                    })
+                    job.progress = (job.progress or 0) + entry_count
+                
+                TransferJobService._run_chunk(db, job, work)
+                TransferJobService._invalidate_caches(
+                    job.source_collection_id, job.dest_collection_id
+                )
+            
+            # Membership changed set-wise; reload lazily on next scoped query
+            company_name_index.forget_collection(job.source_collection_id)
+            company_name_index.forget_collection(job.dest_collection_id)
+            
+            job.status = "completed"
+            job.completed_at = datetime.utcnow()
+            db.commit()
+            
+        except Exception as e:
+            if job:
+                db.rollback()
+                job.status = "failed"
+                job.error_message = str(e)
+                job.completed_at = datetime.utcnow()
+                db.commit()
+            print(f"Undo job {undo_job_id} failed: {e}")
+        finally:
+            db.close()
@@ -0,0 +1,70 @@
+"""Per-request CPU time of a ``limit=1000`` company page, old path vs new.
+
+"entities" is the previous path: load ORM entities, look up ``liked`` in a
+second query, validate ``CompanyBatchOutput`` and let FastAPI's
+``JSONResponse`` encode it. "projection" is the current one:
+``fetch_company_page`` plus ``FastJSONResponse`` (orjson). Both run
+in-process against ``DATABASE_URL`` (seeded by ``python -m
+backend.db.bootstrap``); CPU time includes the driver decoding rows::
+
+    python -m benchmarks.company_page [--limit 1000] [--requests 200]
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.db import database
+from backend.routes.companies import (
+    CompanyBatchOutput,
+    fetch_companies_with_liked,
+    fetch_company_page,
+)
+from backend.routes.responses import FastJSONResponse
+
+
+def entities_page(db, offset: int, limit: int) -> bytes:
+    results = db.query(database.Company).offset(offset).limit(limit).all()
+    companies = fetch_companies_with_liked(db, [company.id for company in results])
+    output = CompanyBatchOutput(companies=companies, total=len(companies))
+    return JSONResponse(jsonable_encoder(output)).body
+
+
+def projection_page(db, offset: int, limit: int) -> bytes:
+    companies = fetch_company_page(db, offset, limit)
+    return FastJSONResponse({"companies": companies, "total": len(companies)}).body
+
+
+def measure(render, limit: int, requests: int):
+    """Median CPU and wall milliseconds per request, plus the body size."""
+    cpu, wall = [], []
+    db = database.SessionLocal()
+    try:
+        render(db, 0, limit)  # warm caches and the connection
+        for i in range(requests):
+            offset = (i * limit) % 9000
+            cpu_started, wall_started = time.process_time(), time.perf_counter()
+            body = render(db, offset, limit)
+            cpu.append((time.process_time() - cpu_started) * 1000)
+            wall.append((time.perf_counter() - wall_started) * 1000)
+            db.rollback()
+    finally:
+        db.close()
+    return statistics.median(cpu), statistics.median(wall), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    for label, render in (("entities", entities_page), ("projection", projection_page)):
+        cpu, wall, size = measure(render, args.limit, args.requests)
+        print(f"{label:<12}cpu {cpu:6.2f} ms   wall {wall:6.2f} ms   body {size:,} B")
+
+
+if __name__ == "__main__":
+    main()
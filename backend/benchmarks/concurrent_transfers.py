@@ -0,0 +1,231 @@
+"""Stress test: many opposing transfers over overlapping companies at once.
+
+Creates two scratch collections sharing a pool of companies. All start in
+A, and the first ``--shared`` of them are in B as well, so transfers also
+take the "already in the destination" path. It then runs ``--jobs``
+transfer jobs on ``--threads`` threads, half A -> B and half B -> A, each
+selecting a random sample of the pool. Jobs run the background path
+(``_process_transfer_job``) directly, so the scheduler's caps don't
+serialize them. Afterwards it checks that:
+
+- every job completed (lock conflicts were retried, not dropped),
+- every company some job selected is in exactly one of the two
+  collections, and every other company is where it started,
+- for companies that started in one collection, each job journaled as
+  many inserts as deletes (no row was lost).
+
+Prints throughput and exits non-zero on any inconsistency. Runs against
+``DATABASE_URL`` (e.g. the compose Postgres) and removes its collections
+and jobs afterwards::
+
+    python -m benchmarks.concurrent_transfers [--jobs 32] [--threads 8]
+
+``--skip-throttle`` disables triggers for this process's sessions
+(``session_replication_role``, needs a superuser) to measure the locking
+path without the 100 ms per-row insert delay.
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event, text
+
+from backend.db import database
+from backend.models.transfer import CompanySelection
+from backend.services.transfer_service import TransferJobService
+
+
+def create_collections(pool_size: int, shared: int = 0):
+    """Two scratch collections; A holds ``pool_size`` existing companies.
+
+    The first ``shared`` of them are also in B. Returns ``(a, b, company_ids,
+    shared_ids)``.
+    """
+    a, b = uuid.uuid4(), uuid.uuid4()
+    with database.engine.begin() as conn:
+        conn.execute(
+            text("""
+                INSERT INTO company_collections (id, collection_name)
+                VALUES (:a, 'stress A'), (:b, 'stress B')
+            """),
+            {"a": a, "b": b},
+        )
+        company_ids = conn.execute(
+            text("""
+                INSERT INTO company_collection_associations (company_id, collection_id)
+                SELECT id, :a FROM companies ORDER BY id LIMIT :pool_size
+                RETURNING company_id
+            """),
+            {"a": a, "pool_size": pool_size},
+        ).scalars().all()
+        shared_ids = sorted(company_ids)[:shared]
+        conn.execute(
+            text("""
+                INSERT INTO company_collection_associations (company_id, collection_id)
+                SELECT unnest(CAST(:shared_ids AS integer[])), :b
+            """),
+            {"shared_ids": shared_ids, "b": b},
+        )
+    return a, b, company_ids, shared_ids
+
+
+def drop_collections(a: uuid.UUID, b: uuid.UUID) -> None:
+    params = {"collection_ids": [a, b]}
+    with database.engine.begin() as conn:
+        jobs = """
+            SELECT id FROM transfer_jobs
+            WHERE source_collection_id = ANY(CAST(:collection_ids AS uuid[]))
+        """
+        conn.execute(text(f"""
+            DELETE FROM transfer_journal_entries WHERE job_id IN ({jobs})
+        """), params)
+        conn.execute(text(f"DELETE FROM transfer_jobs WHERE id IN ({jobs})"), params)
+        conn.execute(text("""
+            DELETE FROM company_collection_associations
+            WHERE collection_id = ANY(CAST(:collection_ids AS uuid[]))
+        """), params)
+        conn.execute(text("""
+            DELETE FROM company_collections
+            WHERE id = ANY(CAST(:collection_ids AS uuid[]))
+        """), params)
+
+
+def run_job(source_id: uuid.UUID, dest_id: uuid.UUID, company_ids) -> str:
+    selection = CompanySelection(include_ids=company_ids)
+    db = database.SessionLocal()
+    try:
+        job_id = TransferJobService.create_transfer_job(
+            db, source_id, dest_id, selection, len(company_ids)
+        )
+    finally:
+        db.close()
+    TransferJobService._process_transfer_job(job_id, source_id, dest_id, selection)
+    return job_id
+
+
+def check(a: uuid.UUID, b: uuid.UUID, company_ids, shared_ids, selected_ids, job_ids):
+    """Inconsistencies found, as human-readable lines."""
+    problems = []
+    # Selected companies end in exactly one collection; the rest stay put
+    expected = {
+        company_id: 2 if company_id in shared_ids and company_id not in selected_ids else 1
+        for company_id in company_ids
+    }
+    with database.engine.connect() as conn:
+        for job_id, status, error in conn.execute(
+            text("""
+                SELECT id, status, error_message FROM transfer_jobs
+                WHERE id = ANY(:job_ids) AND status <> 'completed'
+            """),
+            {"job_ids": job_ids},
+        ):
+            problems.append(f"job {job_id} {status}: {error}")
+
+        memberships = conn.execute(
+            text("""
+                SELECT c.company_id, count(a.collection_id)
+                FROM unnest(CAST(:company_ids AS integer[])) AS c(company_id)
+                LEFT JOIN company_collection_associations a
+                  ON a.company_id = c.company_id
+                 AND a.collection_id IN (:a, :b)
+                GROUP BY c.company_id
+            """),
+            {"company_ids": company_ids, "a": a, "b": b},
+        ).all()
+        for company_id, count in memberships:
+            if count != expected[company_id]:
+                problems.append(
+                    f"company {company_id} is in {count} collections,"
+                    f" expected {expected[company_id]}"
+                )
+
+        for job_id, removed, added in conn.execute(
+            text("""
+                SELECT job_id,
+                       count(*) FILTER (WHERE action = :removed),
+                       count(*) FILTER (WHERE action = :added)
+                FROM transfer_journal_entries
+                WHERE job_id = ANY(:job_ids)
+                  AND company_id <> ALL(CAST(:shared_ids AS integer[]))
+                GROUP BY job_id
+                HAVING count(*) FILTER (WHERE action = :removed)
+                    <> count(*) FILTER (WHERE action = :added)
+            """),
+            {
+                "job_ids": job_ids,
+                "shared_ids": sorted(shared_ids),
+                "removed": database.JOURNAL_REMOVED,
+                "added": database.JOURNAL_ADDED,
+            },
+        ):
+            problems.append(f"job {job_id} removed {removed} but added {added}")
+
+        moved, conflicts = conn.execute(
+            text("""
+                SELECT
+                    (SELECT count(*) FROM transfer_journal_entries
+                     WHERE job_id = ANY(:job_ids) AND action = :added),
+                    (SELECT coalesce(sum(conflicts), 0) FROM transfer_jobs
+                     WHERE id = ANY(:job_ids))
+            """),
+            {"job_ids": job_ids, "added": database.JOURNAL_ADDED},
+        ).one()
+    return problems, moved, conflicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--pool", type=int, default=200, help="companies shared by all jobs")
+    parser.add_argument("--batch", type=int, default=40, help="companies selected per job")
+    parser.add_argument("--shared", type=int, default=50, help="pool companies also in B")
+    parser.add_argument("--skip-throttle", action="store_true")
+    args = parser.parse_args()
+
+    if args.skip_throttle:
+        @event.listens_for(database.engine, "connect")
+        def disable_triggers(dbapi_connection, _):
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute("SET session_replication_role = replica")
+
+    rng = random.Random(0)
+    a, b, company_ids, shared_ids = create_collections(args.pool, args.shared)
+    try:
+        jobs = [
+            (a, b) if i % 2 == 0 else (b, a)
+            for i in range(args.jobs)
+        ]
+        samples = [rng.sample(company_ids, min(args.batch, len(company_ids))) for _ in jobs]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            job_ids = list(pool.map(
+                lambda job: run_job(*job[0], job[1]), zip(jobs, samples)
+            ))
+        elapsed = time.perf_counter() - started
+
+        selected_ids = {company_id for sample in samples for company_id in sample}
+        problems, moved, conflicts = check(
+            a, b, company_ids, set(shared_ids), selected_ids, job_ids
+        )
+        print(f"{'jobs:':<20}{len(job_ids)} on {args.threads} threads")
+        print(f"{'elapsed:':<20}{elapsed:.1f} s")
+        print(f"{'companies moved:':<20}{moved} ({moved / elapsed:.1f}/s)")
+        print(f"{'jobs per second:':<20}{len(job_ids) / elapsed:.2f}")
+        print(f"{'retried conflicts:':<20}{conflicts}")
+        for problem in problems:
+            print(f"INCONSISTENT: {problem}")
+        print("consistent" if not problems else f"{len(problems)} problems")
+    finally:
+        drop_collections(a, b)
+
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Cross-process cache invalidation lag over LISTEN/NOTIFY.
+
+Starts ``--listeners`` worker processes, each running an
+``InvalidationListener`` against ``DATABASE_URL``. The parent then
+publishes ``--events`` invalidations, one committed transaction each. It
+also publishes as many in transactions it rolls back. Workers report when
+each event reached their subscriber. The script prints commit-to-delivery
+lag and exits non-zero if a committed event is missing or a rolled-back one
+arrived::
+
+    python -m benchmarks.invalidation_lag [--listeners 4] [--events 500]
+"""
+import argparse
+import multiprocessing
+import queue
+import statistics
+import sys
+import time
+import uuid
+
+from backend.db import database
+from backend.services import cache_bus
+
+READY = "ready"
+SETTLE_SECONDS = 2.0
+
+
+def listen(events: multiprocessing.Queue, stop: multiprocessing.Event) -> None:
+    """Worker process: report every invalidation it receives."""
+    listener = cache_bus.InvalidationListener()
+    ready = []
+
+    def report(collection_id):
+        if collection_id is None:
+            # The flush after LISTEN took effect: from now on nothing is missed
+            if not ready:
+                ready.append(True)
+                events.put((READY, time.time()))
+            return
+        events.put((str(collection_id), time.time()))
+
+    listener.subscribe(report)
+    listener.start(database.engine)
+    stop.wait()
+    listener.stop()
+
+
+def publish_events(count: int, pause: float):
+    """Publish ``count`` committed and ``count`` rolled-back invalidations."""
+    committed, rolled_back = {}, set()
+    db = database.SessionLocal()
+    try:
+        for _ in range(count):
+            collection_id = uuid.uuid4()
+            cache_bus.publish(db, collection_id)
+            # Lag counts from the start of COMMIT, when delivery can begin
+            committed[str(collection_id)] = time.time()
+            db.commit()
+
+            collection_id = uuid.uuid4()
+            cache_bus.publish(db, collection_id)
+            db.rollback()
+            rolled_back.add(str(collection_id))
+            time.sleep(pause)
+    finally:
+        db.close()
+    return committed, rolled_back
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--listeners", type=int, default=4)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--pause-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Spawned, not forked: each worker needs its own PROCESS_TOKEN
+    context = multiprocessing.get_context("spawn")
+    events, stop = context.Queue(), context.Event()
+    workers = [
+        context.Process(target=listen, args=(events, stop), daemon=True)
+        for _ in range(args.listeners)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for _ in workers:
+            assert events.get(timeout=30)[0] == READY
+
+        committed, rolled_back = publish_events(args.events, args.pause_ms / 1000)
+
+        lags, leaked = [], 0
+        deadline = time.time() + SETTLE_SECONDS
+        while time.time() < deadline:
+            try:
+                collection_id, received_at = events.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if collection_id in rolled_back:
+                leaked += 1
+            elif collection_id in committed:
+                lags.append((received_at - committed[collection_id]) * 1000)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=5)
+
+    expected = len(committed) * args.listeners
+    missing = expected - len(lags)
+    lags.sort()
+    print(f"{'listeners:':<24}{args.listeners}")
+    print(f"{'events delivered:':<24}{len(lags)} / {expected}")
+    if lags:
+        print(f"{'lag median:':<24}{statistics.median(lags):.2f} ms")
+        print(f"{'lag p99:':<24}{lags[int(len(lags) * 0.99)]:.2f} ms")
+        print(f"{'lag max:':<24}{lags[-1]:.2f} ms")
+    print(f"{'rolled back, delivered:':<24}{leaked}")
+    if missing or leaked:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
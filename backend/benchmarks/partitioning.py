@@ -0,0 +1,225 @@
+"""Collection page, count, transfer and empty-collection timings with and
+without hash-partitioned ``company_collection_associations``.
+
+Creates two scratch databases next to ``DATABASE_URL`` (same server), one
+per layout, and fills both with the same synthetic data: ``--collections``
+collections of ``--members`` companies each, inserted interleaved across
+collections as memberships arrive in practice. The throttle trigger is not
+installed, so transfers measure the set-based SQL and locking only. Both
+databases are dropped afterwards unless ``--keep``::
+
+    python -m benchmarks.partitioning [--collections 40] [--members 50000]
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.db import bootstrap, database
+from backend.models.transfer import CompanySelection
+from backend.routes.companies import (
+    LIKED_COLLECTION_NAME,
+    fetch_company_page,
+    reset_liked_collection_id,
+)
+from backend.services.count_service import CountService, CountStrategy
+from backend.services.transfer_service import TransferJobService
+
+PAGE_SIZE = 100
+TRANSFER_SIZE = 1000
+
+
+def server_engine():
+    return create_engine(database.engine.url, isolation_level="AUTOCOMMIT")
+
+
+def create_bench_database(name: str, partitions: int, args):
+    with server_engine().connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+
+    engine = create_engine(database.engine.url.set(database=name))
+    bootstrap.create_tables(engine, partitions)
+    with engine.begin() as conn:
+        for statement in bootstrap.MIGRATIONS:
+            conn.execute(text(statement))
+        conn.execute(
+            text("""
+                INSERT INTO companies (company_name)
+                SELECT 'Company ' || g FROM generate_series(1, :companies) g
+            """),
+            {"companies": args.companies},
+        )
+        conn.execute(
+            text("""
+                INSERT INTO company_collections (id, collection_name)
+                SELECT gen_random_uuid(), 'Bench ' || g
+                FROM generate_series(1, :collections) g;
+                INSERT INTO company_collections (id, collection_name)
+                VALUES (gen_random_uuid(), :liked_name);
+            """),
+            {"collections": args.collections, "liked_name": LIKED_COLLECTION_NAME},
+        )
+        # Interleaved: row g of every collection before row g + 1 of any
+        conn.execute(
+            text("""
+                INSERT INTO company_collection_associations (company_id, collection_id)
+                SELECT (c.k * 7919 + g) % :companies + 1, c.id
+                FROM generate_series(1, :members) g
+                CROSS JOIN (
+                    SELECT id, row_number() OVER (ORDER BY id) AS k
+                    FROM company_collections
+                    WHERE collection_name <> :liked_name
+                ) c
+                ORDER BY g, c.k;
+                INSERT INTO company_collection_associations (company_id, collection_id)
+                SELECT g, id FROM company_collections, generate_series(1, 10) g
+                WHERE collection_name = :liked_name;
+            """),
+            {
+                "companies": args.companies,
+                "members": args.members,
+                "liked_name": LIKED_COLLECTION_NAME,
+            },
+        )
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+    return engine
+
+
+def drop_bench_database(engine) -> None:
+    name = engine.url.database
+    engine.dispose()
+    with server_engine().connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+
+
+def association_bytes(db) -> int:
+    # pg_partition_tree is empty for a plain table
+    return db.execute(text("""
+        SELECT coalesce(
+            (SELECT sum(pg_total_relation_size(relid))
+             FROM pg_partition_tree('company_collection_associations')),
+            pg_total_relation_size('company_collection_associations')
+        )
+    """)).scalar()
+
+
+def collection_ids(db):
+    return db.execute(text("""
+        SELECT id FROM company_collections
+        WHERE collection_name <> :liked_name ORDER BY collection_name
+    """), {"liked_name": LIKED_COLLECTION_NAME}).scalars().all()
+
+
+def timed(work, runs: int) -> float:
+    """Median milliseconds of ``work(run)`` over ``runs`` runs, after a warm-up."""
+    work(-1)
+    timings = []
+    for run in range(runs):
+        started = time.perf_counter()
+        work(run)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def measure(engine, args):
+    db = sessionmaker(bind=engine)()
+    reset_liked_collection_id()
+    rng = random.Random(0)
+    try:
+        collections = collection_ids(db)
+        results = {"table + indexes": f"{int(association_bytes(db)) / 1e6:.0f} MB"}
+
+        def page(run):
+            fetch_company_page(
+                db,
+                rng.randrange(args.members - PAGE_SIZE),
+                PAGE_SIZE,
+                rng.choice(collections),
+            )
+            db.rollback()
+
+        def count(run):
+            collection_id = rng.choice(collections)
+            CountService.count(
+                db,
+                db.query(database.CompanyCollectionAssociation).filter(
+                    database.CompanyCollectionAssociation.collection_id == collection_id
+                ),
+                CountStrategy.EXACT,
+                collection_id=collection_id,
+            )
+            db.rollback()
+
+        def transfer(run):
+            source_id, dest_id = rng.sample(collections, 2)
+            company_ids = db.execute(text("""
+                SELECT company_id FROM company_collection_associations
+                WHERE collection_id = :source_id
+                ORDER BY id OFFSET :offset LIMIT :size
+            """), {
+                "source_id": source_id,
+                "offset": rng.randrange(args.members - TRANSFER_SIZE),
+                "size": TRANSFER_SIZE,
+            }).scalars().all()
+            selection = CompanySelection(include_ids=company_ids)
+            job_id = TransferJobService.create_transfer_job(
+                db, source_id, dest_id, selection, len(company_ids)
+            )
+            TransferJobService.transfer_companies_sync(
+                db, source_id, selection, dest_id, job_id
+            )
+
+        def empty(run):
+            db.execute(
+                text("DELETE FROM company_collection_associations WHERE collection_id = :id"),
+                {"id": rng.choice(collections)},
+            )
+            db.rollback()
+
+        results[f"page (limit {PAGE_SIZE})"] = f"{timed(page, args.runs * 5):.2f} ms"
+        results["exact count"] = f"{timed(count, args.runs):.2f} ms"
+        results[f"transfer {TRANSFER_SIZE}"] = f"{timed(transfer, args.runs):.1f} ms"
+        results["empty collection"] = f"{timed(empty, args.runs):.1f} ms"
+        return results
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=100_000)
+    parser.add_argument("--collections", type=int, default=40)
+    parser.add_argument("--members", type=int, default=50_000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch databases")
+    args = parser.parse_args()
+
+    suffix = uuid.uuid4().hex[:6]
+    layouts = (("unpartitioned", 0), (f"{args.partitions} partitions", args.partitions))
+    columns = []
+    for label, partitions in layouts:
+        name = f"{database.engine.url.database}_bench_{'part' if partitions else 'plain'}_{suffix}"
+        started = time.perf_counter()
+        engine = create_bench_database(name, partitions, args)
+        print(f"{label}: loaded {name} in {time.perf_counter() - started:.0f} s")
+        try:
+            columns.append((label, measure(engine, args)))
+        finally:
+            if not args.keep:
+                drop_bench_database(engine)
+
+    print()
+    print(f"{'':<20}" + "".join(f"{label:>18}" for label, _ in columns))
+    for metric in columns[0][1]:
+        print(f"{metric:<20}" + "".join(f"{results[metric]:>18}" for _, results in columns))
+
+
+if __name__ == "__main__":
+    main()
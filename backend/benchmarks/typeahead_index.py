@@ -0,0 +1,103 @@
+"""Memory and latency of the in-process company name index at scale.
+
+Builds ``CompanyNameIndex`` from synthetic two-word names (no database
+needed) and reports the numbers quoted in the module docstring of
+``backend.services.typeahead_index``::
+
+    python -m benchmarks.typeahead_index [--companies 1000000]
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import time
+import tracemalloc
+import uuid
+
+# The index module imports the database module, which needs a URL but
+# never connects here.
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+
+from backend.services.typeahead_index import CompanyNameIndex  # noqa: E402
+
+VOCABULARY_SIZE = 6000
+QUERIES = 2000
+
+
+def make_vocabulary(rng: random.Random):
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))))
+    return sorted(words)
+
+
+def measure(index: CompanyNameIndex, queries, **kwargs):
+    """Median and p99 latency in microseconds."""
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit=10, **kwargs)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)]
+
+
+def report(label: str, latency) -> None:
+    median, p99 = latency
+    print(f"{label + ':':<28}median {median:.0f} us, p99 {p99:.0f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng)
+    names = [
+        f"{rng.choice(vocabulary).title()} {rng.choice(vocabulary).title()}"
+        for _ in range(args.companies)
+    ]
+
+    index = CompanyNameIndex()
+    tracemalloc.start()
+    started = time.perf_counter()
+    index.build(enumerate(names, start=1))
+    build_seconds = time.perf_counter() - started
+    # The names list itself is held by the benchmark, not the index
+    index_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{'companies:':<28}{args.companies:,}")
+    print(f"{'build:':<28}{build_seconds:.1f} s")
+    print(f"{'index (excl. names):':<28}{index_bytes / 1e6:.0f} MB")
+    print(f"{'name strings:':<28}{sum(len(n) + 49 for n in names) / 1e6:.0f} MB")
+
+    one_token = [rng.choice(vocabulary)[:rng.randint(1, 3)] for _ in range(QUERIES)]
+    two_token = [
+        f"{rng.choice(vocabulary)[:2]} {rng.choice(vocabulary)[:2]}"
+        for _ in range(QUERIES)
+    ]
+    # One-letter words match plenty of names, two-letter ones only a few
+    two_letters = [
+        f"{rng.choice(vocabulary)[:1]} {rng.choice(vocabulary)[:1]}"
+        for _ in range(QUERIES)
+    ]
+    report("one-token, unscoped", measure(index, one_token))
+    report("two-token, unscoped", measure(index, two_token))
+    report("two one-letter tokens", measure(index, two_letters))
+
+    for label, size in (("10 members", 10), ("1% of companies", args.companies // 100)):
+        collection_id = uuid.uuid4()
+        index._memberships[collection_id] = set(
+            rng.sample(range(1, args.companies + 1), size)
+        )
+        report(
+            f"one-token, {label}",
+            measure(index, one_token, collection_id=collection_id),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,117 +1,117 @@
 # app/main.py
 
-import randomname
+import asyncio
+import os
+
 from fastapi import FastAPI
-from fastapi.concurrency import asynccontextmanager
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from fastapi.concurrency import asynccontextmanager, run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 
-from backend.db import database
-from backend.routes import companies
+from backend.db import bootstrap, database
+from backend.routes import companies, health
 from backend.routes import collections_refactored as collections
+from backend.services.cache_bus import invalidation_listener
+from backend.services.count_service import count_cache
+from backend.services.transfer_scheduler import worker_lease
+from backend.services.transfer_service import TransferJobService
+from backend.services.typeahead_index import company_name_index
 
+# Set to "false" in production, where `python -m backend.db.bootstrap` runs
+# once per deploy; workers then only verify the schema version on boot.
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "true").lower() == "true"
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    database.Base.metadata.create_all(bind=database.engine)
+# Startup is retried with capped exponential backoff until it succeeds, e.g.
+# while Postgres is still starting or the deploy hook hasn't migrated yet.
+STARTUP_RETRY_BASE_DELAY_SECONDS = 1.0
+STARTUP_RETRY_MAX_DELAY_SECONDS = 30.0
 
-    db = database.SessionLocal()
-    if not db.query(database.Settings).get("seeded"):
-        seed_database(db)
 
-        db.add(database.Settings(setting_name="seeded"))
-        db.commit()
-        db.close()
-    yield
-    # Clean up...
+def _warm_up() -> None:
+    if DB_INIT_ON_STARTUP:
+        bootstrap.ensure_schema(database.engine)
+    else:
+        bootstrap.check_schema(database.engine)
 
+    # Open pooled connections so the first routed requests don't pay for them
+    database.ping_engines()
 
-app = FastAPI(lifespan=lifespan)
 
+def _requeue_orphaned_jobs() -> None:
+    """Take the worker lease, then adopt jobs queued by workers that died."""
+    if not worker_lease.start(database.engine):
+        print("Worker lease not taken yet; orphaned jobs stay pending")
+        return
+    db = database.SessionLocal()
+    try:
+        requeued = TransferJobService.requeue_orphaned_jobs(db)
+        if requeued:
+            print(f"Requeued {requeued} transfer jobs left pending by a stopped worker")
+    except Exception as e:
+        print(f"Could not requeue orphaned transfer jobs: {e}")
+    finally:
+        db.close()
 
-def seed_database(db: Session):
-    db.execute(text("TRUNCATE TABLE company_collections CASCADE;"))
-    db.execute(text("TRUNCATE TABLE companies CASCADE;"))
-    db.execute(text("TRUNCATE TABLE company_collection_associations CASCADE;"))
-    db.execute(
-        text("""
-    DROP TRIGGER IF EXISTS throttle_updates_trigger ON company_collection_associations;
-    """)
-    )
-    db.commit()
-
-    companies = [
-        database.Company(company_name=randomname.get_name().replace("-", " ").title())
-        for _ in range(10000)
-    ]
-    db.bulk_save_objects(companies)
-    db.commit()
-
-    my_list = database.CompanyCollection(collection_name="My List")
-    db.add(my_list)
-    db.commit()
-
-    associations = [
-        database.CompanyCollectionAssociation(
-            company_id=company.id, collection_id=my_list.id
-        )
-        for company in db.query(database.Company).limit(50000).all()
-    ]
-    db.bulk_save_objects(associations)
-    db.commit()
-
-    liked_companies = database.CompanyCollection(collection_name="Liked Companies List")
-    db.add(liked_companies)
-    db.commit()
-
-    associations = [
-        database.CompanyCollectionAssociation(
-            company_id=company.id, collection_id=liked_companies.id
-        )
-        for company in db.query(database.Company).limit(10).all()
-    ]
-    db.bulk_save_objects(associations)
-    db.commit()
-
-    companies_to_ignore = database.CompanyCollection(
-        collection_name="Companies to Ignore List"
-    )
-    db.add(companies_to_ignore)
-    db.commit()
-
-    associations = [
-        database.CompanyCollectionAssociation(
-            company_id=company.id, collection_id=companies_to_ignore.id
-        )
-        for company in db.query(database.Company).limit(50).all()
-    ]
-    db.bulk_save_objects(associations)
-    db.commit()
-
-    db.execute(
-        text("""
-CREATE OR REPLACE FUNCTION throttle_updates()
-RETURNS TRIGGER AS $$
-BEGIN
-    PERFORM pg_sleep(0.1); -- Sleep for 100 milliseconds to simulate a slow update
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-    """)
-    )
 
-    db.execute(
-        text("""
-CREATE TRIGGER throttle_updates_trigger
-BEFORE INSERT ON company_collection_associations
-FOR EACH ROW
-EXECUTE FUNCTION throttle_updates();
-    """)
+def _evict_local_caches(collection_id) -> None:
+    """Apply another worker's invalidation (None: flush everything)."""
+    if collection_id is None:
+        count_cache.clear()
+        company_name_index.forget_all_collections()
+        companies.reset_liked_collection_id()
+        return
+    count_cache.invalidate(collection_id)
+    company_name_index.forget_collection(collection_id)
+
+
+async def _start_when_database_ready(app: FastAPI) -> None:
+    """Retry the startup check until it passes, then mark the worker ready."""
+    delay = STARTUP_RETRY_BASE_DELAY_SECONDS
+    while True:
+        try:
+            await run_in_threadpool(_warm_up)
+            break
+        except Exception as e:
+            # Liveness still passes; readiness reports the error until fixed
+            app.state.startup_error = str(e)
+            print(f"Startup check failed, retrying in {delay:.0f}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STARTUP_RETRY_MAX_DELAY_SECONDS)
+
+    app.state.startup_error = None
+    await run_in_threadpool(_requeue_orphaned_jobs)
+    # Built off the request path; typeahead falls back to SQL until done
+    company_name_index.load_in_background(database.ReadSessionLocal)
+
+    # Other workers' transfers evict this worker's caches; cached counts,
+    # memberships and the liked id are bypassed whenever that stream might
+    # be missing events
+    invalidation_listener.subscribe(_evict_local_caches)
+    count_cache.set_reliability_check(lambda: invalidation_listener.healthy)
+    company_name_index.set_reliability_check(lambda: invalidation_listener.healthy)
+    companies.set_liked_collection_reliability_check(
+        lambda: invalidation_listener.healthy
     )
-    db.commit()
+    invalidation_listener.start(database.engine)
+    app.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.startup_error = None
+    # Serve /healthz right away; /readyz turns 200 once this finishes
+    startup = asyncio.create_task(_start_when_database_ready(app))
+    yield
+    # Clean up...
+    startup.cancel()
+    invalidation_listener.stop()
+    worker_lease.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
+app.include_router(health.router)
 app.include_router(companies.router)
 app.include_router(collections.router)
 
@@ -18,7 +18,8 @@ interface CompanyTableProps {
   onTransfer: (
     destCollectionId: string,
     companyIds: number[],
-    transferAll?: boolean
+    transferAll?: boolean,
+    search?: string
   ) => Promise<void>;
   transferJob: TransferJob | null;
   onUpdateCollectionCounts: (
@@ -49,7 +50,7 @@ const CompanyTable = memo(function CompanyTable({
     totalCount,
     error,
     loadMore,
-    refresh,
+    syncChanges,
     clearCache,
     optimisticRemoveCompanies,
     optimisticRestoreCompanies,
@@ -78,6 +79,7 @@ const CompanyTable = memo(function CompanyTable({
     onUpdateCollectionCounts,
     clearCache,
     clearSelection: selectionState.clearSelection,
+    searchTerm,
     toast,
   });
 
@@ -96,8 +98,7 @@ const CompanyTable = memo(function CompanyTable({
       }
 
       setTimeout(() => {
-        clearCache();
-        refresh();
+        syncChanges();
       }, 500);
     },
   });
@@ -1,5 +1,5 @@
 import { useState, useEffect, useCallback, useRef } from 'react';
-import { getCollectionsById } from '@/utils/jam-api';
+import { getCollectionChanges, getCollectionsById } from '@/utils/jam-api';
 import type { Company, Collection, CompanyStatus } from '@/lib/types';
 
 interface UseInfiniteCompaniesProps {
@@ -17,6 +17,7 @@ interface UseInfiniteCompaniesReturn {
   error: string | null;
   loadMore: () => Promise<void>;
   refresh: () => Promise<void>;
+  syncChanges: () => Promise<void>;
   clearCache: () => void;
   optimisticRemoveCompanies: (companyIds: number[]) => void;
   optimisticRestoreCompanies: (companies: Company[]) => void;
@@ -43,6 +44,13 @@ export function useInfiniteCompanies({
   const offsetRef = useRef(0);
   const isInitialLoadRef = useRef(true);
 
+  // Change feed position of the loaded pages, per collection
+  const changeSeqRef = useRef<{ collectionId: string; seq: number } | null>(
+    null
+  );
+  // Already dropped from the list and the total by optimistic updates
+  const optimisticallyRemovedRef = useRef<Set<number>>(new Set());
+
   // Cache for instant switching between collections
   const cacheRef = useRef<
     Map<
@@ -51,6 +59,7 @@ export function useInfiniteCompanies({
         companies: Company[];
         totalCount: number;
         searchTerm: string;
+        changeSeq: number | null;
       }
     >
   >(new Map());
@@ -81,6 +90,7 @@ export function useInfiniteCompanies({
         return {
           companies: response.companies || [],
           total: response.total || 0,
+          changeSeq: response.change_seq ?? null,
         };
       } catch (err) {
         const errorMessage =
@@ -105,6 +115,11 @@ export function useInfiniteCompanies({
       setTotalCount(cached.totalCount);
       setHasMore(cached.companies.length < cached.totalCount);
       offsetRef.current = cached.companies.length;
+      optimisticallyRemovedRef.current.clear();
+      changeSeqRef.current =
+        cached.changeSeq === null
+          ? null
+          : { collectionId: collection.id, seq: cached.changeSeq };
       return;
     }
 
@@ -112,17 +127,21 @@ export function useInfiniteCompanies({
     offsetRef.current = 0;
 
     try {
-      const { companies: newCompanies, total } = await loadCompanies(
-        collection.id,
-        0,
-        pageSize,
-        searchTerm
-      );
+      const {
+        companies: newCompanies,
+        total,
+        changeSeq,
+      } = await loadCompanies(collection.id, 0, pageSize, searchTerm);
 
       setCompanies(newCompanies);
       setTotalCount(total);
       setHasMore(newCompanies.length < total && newCompanies.length > 0);
       offsetRef.current = newCompanies.length;
+      optimisticallyRemovedRef.current.clear();
+      changeSeqRef.current =
+        changeSeq === null
+          ? null
+          : { collectionId: collection.id, seq: changeSeq };
 
       // Cache results (only for non-search queries to keep cache simple)
       if (!searchTerm) {
@@ -130,6 +149,7 @@ export function useInfiniteCompanies({
           companies: newCompanies,
           totalCount: total,
           searchTerm,
+          changeSeq,
         });
       }
     } catch (err) {
@@ -200,6 +220,60 @@ export function useInfiniteCompanies({
     cacheRef.current.clear();
   }, []);
 
+  // Apply membership changes since the last load instead of refetching.
+  // Removals are applied in place; additions (whose rows the diff doesn't
+  // carry), active searches and stale cursors reload the first page.
+  const syncChanges = useCallback(async () => {
+    if (!collection) return;
+
+    const reload = async () => {
+      clearCache();
+      await refresh();
+    };
+
+    const cursor = changeSeqRef.current;
+    if (searchTerm || !cursor || cursor.collectionId !== collection.id) {
+      await reload();
+      return;
+    }
+
+    try {
+      const response = await getCollectionChanges(collection.id, cursor.seq);
+      if (
+        response.snapshot_required ||
+        response.changes.some(change => change.action === 'added')
+      ) {
+        await reload();
+        return;
+      }
+
+      const removedIds = new Set(
+        response.changes.map(change => change.company_id)
+      );
+      let alreadyCounted = 0;
+      removedIds.forEach(companyId => {
+        if (optimisticallyRemovedRef.current.delete(companyId)) {
+          alreadyCounted += 1;
+        }
+      });
+      changeSeqRef.current = { collectionId: collection.id, seq: response.seq };
+      clearCache();
+
+      setCompanies(prev => {
+        const remaining = prev.filter(company => !removedIds.has(company.id));
+        offsetRef.current = remaining.length;
+        return remaining;
+      });
+      setTotalCount(prev => {
+        const newTotal = Math.max(0, prev - (removedIds.size - alreadyCounted));
+        setHasMore(offsetRef.current < newTotal);
+        return newTotal;
+      });
+    } catch (err) {
+      await reload();
+    }
+  }, [collection, searchTerm, clearCache, refresh]);
+
   // Load companies when collection or search changes
   useEffect(() => {
     refresh();
@@ -207,6 +281,9 @@ export function useInfiniteCompanies({
 
   // Optimistic updates for immediate UX
   const optimisticRemoveCompanies = useCallback((companyIds: number[]) => {
+    companyIds.forEach(companyId =>
+      optimisticallyRemovedRef.current.add(companyId)
+    );
     setCompanies(prev => {
       const filtered = prev.filter(company => !companyIds.includes(company.id));
       offsetRef.current = filtered.length;
@@ -221,6 +298,9 @@ export function useInfiniteCompanies({
 
   const optimisticRestoreCompanies = useCallback(
     (companiesToRestore: Company[]) => {
+      companiesToRestore.forEach(company =>
+        optimisticallyRemovedRef.current.delete(company.id)
+      );
       setCompanies(prev => {
         const restored = [...companiesToRestore, ...prev];
         offsetRef.current = restored.length;
@@ -266,6 +346,7 @@ export function useInfiniteCompanies({
     error,
     loadMore,
     refresh,
+    syncChanges,
     clearCache,
     optimisticRemoveCompanies,
     optimisticRestoreCompanies,
@@ -13,7 +13,8 @@ interface UseTransferCoordinatorReturn {
   handleTransfer: (
     destCollectionId: string,
     companyIds: number[],
-    transferAll?: boolean
+    transferAll?: boolean,
+    search?: string
   ) => Promise<void>;
   clearJob: () => void;
 }
@@ -35,7 +36,8 @@ export function useTransferCoordinator({
     async (
       destCollectionId: string,
       companyIds: number[],
-      transferAll: boolean = false
+      transferAll: boolean = false,
+      search: string = ''
     ): Promise<void> => {
       if (!selectedCollection) return;
 
@@ -44,7 +46,8 @@ export function useTransferCoordinator({
         selectedCollection.id,
         destCollectionId,
         companyIds,
-        transferAll
+        transferAll,
+        search
       );
 
       if (!jobId) return;
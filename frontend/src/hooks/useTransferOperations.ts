@@ -13,7 +13,8 @@ interface UseTransferOperationsReturn {
     sourceCollectionId: string,
     destCollectionId: string,
     companyIds: number[],
-    transferAll?: boolean
+    transferAll?: boolean,
+    search?: string
   ) => Promise<string | null>;
   updateJobProgress: (job: TransferJob) => void;
   clearJob: () => void;
@@ -29,7 +30,8 @@ export function useTransferOperations(): UseTransferOperationsReturn {
       sourceCollectionId: string,
       destCollectionId: string,
       companyIds: number[],
-      transferAll: boolean = false
+      transferAll: boolean = false,
+      search: string = ''
     ): Promise<string | null> => {
       try {
         debugLogger.transfer('Starting', {
@@ -37,15 +39,18 @@ export function useTransferOperations(): UseTransferOperationsReturn {
           destCollectionId,
           companyCount: companyIds.length,
           transferAll,
+          search,
         });
 
         setIsTransferring(true);
         setError(null);
 
+        // Describe "all" as a predicate; the server resolves it in chunks
         const response = await transferCompanies(sourceCollectionId, {
-          company_ids: companyIds,
           dest_collection_id: destCollectionId,
-          transfer_all: transferAll,
+          selection: transferAll
+            ? { all_matching: true, search }
+            : { include_ids: companyIds },
         });
 
         debugLogger.transfer('API Response', {
@@ -53,7 +58,7 @@ export function useTransferOperations(): UseTransferOperationsReturn {
           hasJobId: !!response.job_id,
         });
 
-        if (response.job_id) {
+        if (response.job_id && response.status !== 'completed') {
           // Long-running job - track progress
           debugLogger.transfer('Background Job Created', {
             jobId: response.job_id,
@@ -62,9 +67,11 @@ export function useTransferOperations(): UseTransferOperationsReturn {
             job_id: response.job_id,
             status: 'processing',
             progress: 0,
-            total: transferAll
-              ? TRANSFER_CONSTANTS.ESTIMATED_MAX_COMPANIES_FOR_TRANSFER_ALL
-              : companyIds.length,
+            total: response.plan
+              ? response.plan.to_move + response.plan.already_in_destination
+              : (transferAll
+                ? TRANSFER_CONSTANTS.ESTIMATED_MAX_COMPANIES_FOR_TRANSFER_ALL
+                : companyIds.length),
           });
           return response.job_id;
         } else {
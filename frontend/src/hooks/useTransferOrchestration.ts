@@ -17,7 +17,8 @@ interface UseTransferOrchestrationProps {
   onTransfer: (
     destCollectionId: string,
     companyIds: number[],
-    transferAll?: boolean
+    transferAll?: boolean,
+    search?: string
   ) => Promise<void>;
   onUpdateCollectionCounts: (
     sourceCollectionId: string,
@@ -27,6 +28,7 @@ interface UseTransferOrchestrationProps {
   ) => void;
   clearCache: () => void;
   clearSelection: () => void;
+  searchTerm?: string;
   toast: ToastHook;
 }
 
@@ -34,7 +36,8 @@ interface UseTransferOrchestrationReturn {
   handleTransfer: (
     destCollectionId: string,
     companyIds: number[],
-    transferAll?: boolean
+    transferAll?: boolean,
+    search?: string
   ) => Promise<void>;
 }
 
@@ -49,6 +52,7 @@ export function useTransferOrchestration({
   onUpdateCollectionCounts,
   clearCache,
   clearSelection,
+  searchTerm,
   toast,
 }: UseTransferOrchestrationProps): UseTransferOrchestrationReturn {
   const handleTransfer = useCallback(
@@ -94,7 +98,13 @@ export function useTransferOrchestration({
       );
 
       try {
-        await onTransfer(destCollectionId, companyIds, transferAll);
+        // "All" means all matching the active search, not the whole list
+        await onTransfer(
+          destCollectionId,
+          companyIds,
+          transferAll,
+          transferAll ? searchTerm : undefined
+        );
 
         onUpdateCollectionCounts(
           selectedCollection.id,
@@ -135,6 +145,7 @@ export function useTransferOrchestration({
       toast,
       onUpdateCollectionCounts,
       clearSelection,
+      searchTerm,
     ]
   );
 
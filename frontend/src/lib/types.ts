@@ -29,18 +29,40 @@ export interface TransferJob {
   total: number;
   eta_seconds?: number;
   error_message?: string;
+  conflicts?: number;
+  queue_position?: number | null;
+  queue_depth?: number | null;
+  wait_seconds?: number | null;
+}
+
+// Resolved server-side: include_ids, plus every company matching `search`
+// when all_matching is set, minus exclude_ids.
+export interface CompanySelection {
+  search?: string;
+  all_matching?: boolean;
+  include_ids?: number[];
+  exclude_ids?: number[];
 }
 
 export interface TransferRequest {
-  company_ids: number[];
+  company_ids?: number[];
   dest_collection_id: string;
   transfer_all?: boolean;
+  selection?: CompanySelection;
+}
+
+export interface TransferPlan {
+  requested: number;
+  missing_from_source: number;
+  already_in_destination: number;
+  to_move: number;
 }
 
 export interface TransferResponse {
   job_id?: string;
   status: TransferResponseStatus;
   message: string;
+  plan?: TransferPlan;
 }
 
 // Enhanced progress metrics for better component props
@@ -16,10 +16,32 @@ export interface CompanyBatchResponse {
 export interface ApiCollection extends Collection {
   companies: Company[];
   total: number;
+  total_is_exact?: boolean;
+  // Pass as `since` to getCollectionChanges to keep loaded pages current
+  change_seq?: number;
+}
+
+export interface CollectionChange {
+  seq: number;
+  company_id: number;
+  action: 'added' | 'removed';
+}
+
+// Net changes from `since` up to `seq` (the next `since`); when
+// snapshot_required, refetch the pages instead of applying diffs.
+export interface CollectionChangesResponse {
+  collection_id: string;
+  seq: number;
+  snapshot_required: boolean;
+  changes: CollectionChange[];
 }
 
 const BASE_URL = 'http://localhost:8000';
 
+// The API pins a client's reads to the primary database for a short window
+// after its own transfers via a cookie, so it must be sent cross-origin.
+axios.defaults.withCredentials = true;
+
 export async function getCompanies(
   offset?: number,
   limit?: number
@@ -49,6 +71,8 @@ export async function getCollectionsById(
       offset,
       limit,
       search: search || '',
+      // Exact totals, cached server-side until a transfer touches the collection
+      count_strategy: 'cached',
     };
 
     const response = await axios.get(`${BASE_URL}/collections/${id}`, {
@@ -62,6 +86,47 @@ export async function getCollectionsById(
   }
 }
 
+export interface CompanySuggestion {
+  id: number;
+  company_name: string;
+}
+
+export async function getCompanySuggestions(
+  query: string,
+  collectionId?: string,
+  limit?: number
+): Promise<CompanySuggestion[]> {
+  try {
+    const response = await axios.get(`${BASE_URL}/companies/typeahead`, {
+      params: {
+        q: query,
+        collection_id: collectionId,
+        limit,
+      },
+    });
+    return response.data.suggestions;
+  } catch (error) {
+    console.error('Error fetching company suggestions:', error);
+    throw handleApiError(error);
+  }
+}
+
+export async function getCollectionChanges(
+  collectionId: string,
+  since: number
+): Promise<CollectionChangesResponse> {
+  try {
+    const response = await axios.get(
+      `${BASE_URL}/collections/${collectionId}/changes`,
+      { params: { since } }
+    );
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching collection changes:', error);
+    throw handleApiError(error);
+  }
+}
+
 export async function getCollectionsMetadata(): Promise<Collection[]> {
   try {
     const response = await axios.get(`${BASE_URL}/collections`);
@@ -97,3 +162,14 @@ export async function getJobStatus(jobId: string): Promise<TransferJob> {
     throw handleApiError(error);
   }
 }
+
+export async function undoTransferJob(jobId: string): Promise<TransferResponse> {
+  try {
+    const url = `${BASE_URL}/collections/jobs/${jobId}/undo`;
+    const response = await axios.post(url);
+    return response.data;
+  } catch (error) {
+    console.error('❌ Error undoing transfer job:', error);
+    throw handleApiError(error);
+  }
+}